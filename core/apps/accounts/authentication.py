@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from apps.accounts.cache import TOKEN_VERSION_CLAIM, user_cache_key
+from apps.common.utils import is_shared_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация, которая берет пользователя из кеша вместо запроса к базе данных на каждый запрос.
+
+    Пользователь загружается вместе с профилем продавца (select_related('seller')), поэтому IsSeller
+    и представления продавца не делают отдельный запрос за request.user.seller. Ключ кеша содержит
+    id пользователя и версию токенов из claim 'ver'; запись сбрасывается при сохранении User или Seller,
+    а токены с устаревшей версией (после деактивации учетной записи) отклоняются.
+
+    Сброс записи по сигналу доходит только до кеша процесса, который сохранил пользователя. Поэтому
+    пользователь кешируется только в общем кеше (Redis, Memcached); с кешем в памяти процесса он каждый раз
+    загружается из базы данных, чтобы деактивация и смена версии токенов сразу действовали во всех процессах.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        #  Токены, выданные до появления версии, считаются токенами версии 0.
+        token_version = validated_token.get(TOKEN_VERSION_CLAIM, 0)
+        key = user_cache_key(user_id, token_version)
+        shared_cache = is_shared_cache()
+        user = cache.get(key) if shared_cache else None
+        if user is None:
+            try:
+                user = self.user_model.objects.using('default').select_related('seller').get(
+                    **{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if user.token_version != token_version:
+                raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+            if shared_cache:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from apps.accounts.hashing import make_password, verify_password
+
+UserModel = get_user_model()
+
+
+class PooledHashingModelBackend(ModelBackend):
+    """
+    ModelBackend, который проверяет пароль в пуле потоков хеширования (apps.accounts.hashing).
+
+    Если пароль верен, но сохранен устаревшим хешером или с прежними параметрами стоимости,
+    он перехешируется предпочтительным хешером и сохраняется при входе.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            #  Хешируем пароль и для несуществующего пользователя, чтобы по времени ответа
+            #  нельзя было определить, зарегистрирован ли email.
+            make_password(password)
+            return None
+        is_correct, must_update = verify_password(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = make_password(password)
+            user.save(update_fields=['password'])
+        return user
@@ -0,0 +1,14 @@
+from django.core.cache import cache
+
+USER_CACHE_KEY = 'accounts:user:{}:{}'
+
+#  Claim токена с версией токенов пользователя (User.token_version).
+TOKEN_VERSION_CLAIM = 'ver'
+
+
+def user_cache_key(user_id, token_version) -> str:
+    return USER_CACHE_KEY.format(user_id, token_version)
+
+
+def invalidate_cached_user(user_id, token_version):
+    cache.delete(user_cache_key(user_id, token_version))
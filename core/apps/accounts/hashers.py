@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    Scrypt с параметрами стоимости из настройки PASSWORD_SCRYPT. Алгоритм остается 'scrypt',
+    поэтому хеши совместимы со стандартным ScryptPasswordHasher. После изменения параметров
+    must_update() возвращает True, и пароль перехешируется при следующем входе пользователя.
+    """
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT['work_factor']
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT['block_size']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT['parallelism']
+
+    @property
+    def maxmem(self):
+        return settings.PASSWORD_SCRYPT.get('maxmem', 0)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 с параметрами стоимости из настройки PASSWORD_ARGON2. Требует библиотеку argon2-cffi.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2['time_cost']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2['memory_cost']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2['parallelism']
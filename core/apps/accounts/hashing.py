@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = settings.PASSWORD_HASHING_WORKERS
+                #  Ожидающих хеширования не больше, чем потоков и очередь PASSWORD_HASHING_QUEUE:
+                #  остальные запросы ждут свободного места, а не копят задачи в пуле.
+                _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASHING_QUEUE)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+    return _executor
+
+
+def _submit(func, *args):
+    executor = _get_executor()
+    _slots.acquire()
+    try:
+        future = executor.submit(func, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def make_password(password):
+    """
+    Хеширует пароль предпочтительным хешером в пуле потоков хеширования.
+
+    Пул ограничивает число одновременно хешируемых паролей (PASSWORD_HASHING_WORKERS), поэтому
+    всплеск регистраций и входов занимает не больше этого числа ядер, а остальные запросы
+    процесса продолжают обслуживаться.
+    """
+    return _submit(hashers.make_password, password).result()
+
+
+def verify_password(password, encoded):
+    """
+    Проверяет пароль в пуле потоков хеширования.
+
+    Возвращает:
+        tuple: (пароль верен, хеш нужно пересчитать предпочтительным хешером).
+    """
+    return _submit(hashers.verify_password, password, encoded).result()
+
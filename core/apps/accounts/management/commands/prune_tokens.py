@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет истекшие токены из таблиц OutstandingToken и BlacklistedToken частями, '
+        'чтобы не блокировать таблицы одним большим DELETE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Сколько токенов удаляется за раз.')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Пауза между частями (секунды), чтобы снизить нагрузку на базу данных.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        outstanding_total = blacklisted_total = 0
+        while True:
+            with transaction.atomic():
+                ids = list(OutstandingToken.objects.filter(expires_at__lte=now).order_by('id')
+                           .values_list('id', flat=True)[:options['batch_size']])
+                if not ids:
+                    break
+                #  Сначала удаляются строки черного списка, чтобы удаление OutstandingToken не выполняло каскад.
+                blacklisted, _ = BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                outstanding, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+            outstanding_total += outstanding
+            blacklisted_total += blacklisted
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {outstanding_total} outstanding and {blacklisted_total} blacklisted expired token(s)'))
@@ -0,0 +1,38 @@
+import statistics
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.accounts.tokens import blacklist_cache_key, timed_blacklist_check
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит размер таблиц токенов (всего и истекших) и время проверки черного списка '
+        'без кеша и из кеша по случайной выборке токенов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=100, help='Количество токенов для замера проверки.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        outstanding = OutstandingToken.objects.count()
+        blacklisted = BlacklistedToken.objects.count()
+        self.stdout.write(f'outstanding tokens: {outstanding} '
+                          f'(expired: {OutstandingToken.objects.filter(expires_at__lte=now).count()})')
+        self.stdout.write(f'blacklisted tokens: {blacklisted} '
+                          f'(expired: {BlacklistedToken.objects.filter(token__expires_at__lte=now).count()})')
+
+        jtis = list(OutstandingToken.objects.order_by('?').values_list('jti', flat=True)[:options['samples']])
+        if not jtis:
+            return
+        #  Первый проход выполняется с пустым кешем (запрос к базе данных), второй - из кеша.
+        cache.delete_many([blacklist_cache_key(jti) for jti in jtis])
+        for label in ('database', 'cache'):
+            timings = sorted(timed_blacklist_check(jti) for jti in jtis)
+            p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+            self.stdout.write(f'blacklist check ({label}): p50 {statistics.median(timings):.3f} ms, '
+                              f'p95 {p95:.3f} ms over {len(timings)} token(s)')
@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractBaseUser
 from django.db import models
 from django.utils import timezone
 
+from apps.accounts.cache import invalidate_cached_user
 from apps.accounts.managers import CustomUserManager
 from apps.common.models import IsDeletedModel
 from core import settings
@@ -23,8 +24,10 @@ class User(AbstractBaseUser, IsDeletedModel):
         is_staff (bool): Указывает, может ли пользователь войти на этот административный сайт.
         is_active (bool): Указывает, следует ли считать этого пользователя активным.
         account_type (str): Тип учетной записи (ПРОДАВЕЦ или ПОКУПАТЕЛЬ).
+        token_version (int): Версия токенов пользователя; токены с другой версией (claim 'ver') недействительны.
     Методы:
         full_name(): Возвращает полное имя пользователя.
+        deactivate(): Деактивирует учетную запись и отзывает выданные токены.
         __str__(): Возвращает строковое представление пользователя.
     """
 
@@ -36,6 +39,7 @@ class User(AbstractBaseUser, IsDeletedModel):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     account_type = models.CharField(max_length=6, choices=ACCOUNT_TYPE_CHOICES, default='BUYER')
+    token_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
@@ -61,6 +65,18 @@ class User(AbstractBaseUser, IsDeletedModel):
         """
         return self.full_name
 
+    def deactivate(self):
+        """
+        Деактивирует учетную запись и увеличивает версию токенов, чтобы ранее выданные токены
+        перестали приниматься. Запись кеша для новой версии сбрасывается сигналом post_save,
+        запись для прежней версии - здесь.
+        """
+        previous_version = self.token_version
+        self.is_active = False
+        self.token_version = previous_version + 1
+        self.save()
+        invalidate_cached_user(self.pk, previous_version)
+
     def has_perm(self, perm, obj=None):
         return True
 
@@ -1,8 +1,9 @@
-from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, AuthUser
 from rest_framework_simplejwt.tokens import Token
 
+from apps.accounts.cache import TOKEN_VERSION_CLAIM
+from apps.accounts.hashing import make_password
 from apps.accounts.models import User
 
 
@@ -19,6 +20,9 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
+        #  Версия токенов пользователя: при деактивации учетной записи она увеличивается,
+        #  и токены с прежней версией отклоняются CachedJWTAuthentication.
+        token[TOKEN_VERSION_CLAIM] = user.token_version
 
         # Добавляем пользовательские данные в полезную нагрузку
         if user.is_staff:
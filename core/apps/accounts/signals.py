@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from apps.accounts.cache import invalidate_cached_user
+from apps.accounts.models import User
+from apps.accounts.tokens import remember_blacklisted
+
+
+#  Пользователь кешируется CachedJWTAuthentication вместе с профилем продавца,
+#  поэтому изменение или удаление любого из них сбрасывает запись в кеше.
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk, instance.token_version)
+
+
+@receiver(post_save, sender='sellers.Seller')
+@receiver(post_delete, sender='sellers.Seller')
+def invalidate_seller_user_cache(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id, instance.user.token_version)
+
+
+#  Токен, добавленный в черный список, сразу отмечается в кеше проверок (в том числе поверх
+#  закешированного отрицательного ответа).
+@receiver(post_save, sender=BlacklistedToken)
+def cache_blacklisted_token(sender, instance, **kwargs):
+    remember_blacklisted(instance.token.jti, instance.token.expires_at)
@@ -1,3 +1,82 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from apps.accounts.authentication import CachedJWTAuthentication
+from apps.accounts.models import User
+from apps.accounts.tokens import blacklist_cache_key, is_token_blacklisted
+from apps.common.testing import SHARED_CACHES, create_user
+
+
+class TokenBlacklistCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_negative_result_is_not_cached_in_process_local_cache(self):
+        token = RefreshToken.for_user(create_user())
+        self.assertFalse(is_token_blacklisted(token['jti']))
+        self.assertIsNone(cache.get(blacklist_cache_key(token['jti'])))
+
+    def test_negative_result_is_cached_in_shared_cache(self):
+        token = RefreshToken.for_user(create_user())
+        with override_settings(CACHES=SHARED_CACHES):
+            cache.clear()
+            self.assertFalse(is_token_blacklisted(token['jti']))
+            self.assertIs(cache.get(blacklist_cache_key(token['jti'])), False)
+
+    def test_blacklisted_token_is_cached_until_expiry(self):
+        token = RefreshToken.for_user(create_user())
+        token.blacklist()
+        cache.clear()
+        self.assertTrue(is_token_blacklisted(token['jti']))
+        with self.assertNumQueries(0):
+            self.assertTrue(is_token_blacklisted(token['jti']))
+        #  Запись кеша истекает вместе с токеном, а не хранится бессрочно.
+        expires_at = cache._expire_info[cache.make_key(blacklist_cache_key(token['jti']))]
+        self.assertAlmostEqual(expires_at, token['exp'], delta=5)
+
+    def test_negative_result_does_not_replace_concurrent_blacklisting(self):
+        token = RefreshToken.for_user(create_user())
+        real_first = QuerySet.first
+
+        def stale_first(queryset):
+            #  Запрос к базе данных выполнен до блокировки токена, а запись в кеш - после сигнала post_save.
+            result = real_first(queryset)
+            token.blacklist()
+            return result
+
+        with override_settings(CACHES=SHARED_CACHES):
+            cache.clear()
+            with mock.patch.object(QuerySet, 'first', autospec=True, side_effect=stale_first):
+                self.assertFalse(is_token_blacklisted(token['jti']))
+            self.assertIs(cache.get(blacklist_cache_key(token['jti'])), True)
+
+
+class CachedJWTAuthenticationTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.token = AccessToken.for_user(self.user)
+
+    def test_process_local_cache_reads_user_from_database(self):
+        CachedJWTAuthentication().get_user(self.token)
+        #  Изменение без сигнала post_save (как в другом процессе) действует на следующий же запрос.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            CachedJWTAuthentication().get_user(self.token)
+
+    def test_shared_cache_keeps_user(self):
+        with override_settings(CACHES=SHARED_CACHES):
+            cache.clear()
+            CachedJWTAuthentication().get_user(self.token)
+            with self.assertNumQueries(0):
+                self.assertEqual(CachedJWTAuthentication().get_user(self.token), self.user)
+            self.user.save()
+            with self.assertNumQueries(1):
+                CachedJWTAuthentication().get_user(self.token)
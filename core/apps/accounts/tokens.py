@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer, TokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+
+from apps.common.utils import is_shared_cache
+
+BLACKLIST_CACHE_KEY = 'accounts:blacklist:{}'
+
+
+def blacklist_cache_key(jti) -> str:
+    return BLACKLIST_CACHE_KEY.format(jti)
+
+
+def remember_blacklisted(jti, expires_at):
+    #  Токен остается в черном списке до истечения срока действия, поэтому запись кеша живет столько же.
+    timeout = max(int((expires_at - timezone.now()).total_seconds()), 1)
+    cache.set(blacklist_cache_key(jti), True, timeout)
+
+
+def is_token_blacklisted(jti):
+    """
+    Проверяет, находится ли токен в черном списке, сначала по кешу.
+
+    Положительный ответ кешируется до истечения срока действия токена (токен не может покинуть черный список,
+    а после истечения срока он отклоняется и без черного списка).
+    Отрицательный ответ кешируется на TOKEN_BLACKLIST_CACHE_TIMEOUT секунд только в общем кеше: при
+    добавлении токена в черный список сигнал post_save перезаписывает запись лишь в кеше того процесса,
+    который выполнил блокировку, поэтому с кешем в памяти процесса другие процессы продолжали бы принимать
+    заблокированный токен. В этом случае отрицательный ответ каждый раз проверяется в базе данных.
+    """
+    key = blacklist_cache_key(jti)
+    blacklisted = cache.get(key)
+    if blacklisted is None:
+        expires_at = BlacklistedToken.objects.using('default').filter(token__jti=jti).values_list(
+            'token__expires_at', flat=True).first()
+        blacklisted = expires_at is not None
+        if blacklisted:
+            remember_blacklisted(jti, expires_at)
+        elif is_shared_cache():
+            #  add не перезаписывает True, записанный сигналом post_save, если токен заблокировали
+            #  между запросом к базе данных и записью в кеш.
+            cache.add(key, False, settings.TOKEN_BLACKLIST_CACHE_TIMEOUT)
+    return blacklisted
+
+
+def timed_blacklist_check(jti):
+    #  Проверка с замером времени (в миллисекундах) для команды token_stats.
+    started = time.perf_counter()
+    is_token_blacklisted(jti)
+    return (time.perf_counter() - started) * 1000
+
+
+class CachedRefreshToken(RefreshToken):
+    #  Refresh-токен, который проверяет черный список через кеш, а не запросом к базе данных.
+    def check_blacklist(self):
+        if is_token_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedRefreshToken
+
+
+class CachedTokenVerifySerializer(TokenVerifySerializer):
+    def validate(self, attrs):
+        token = UntypedToken(attrs["token"])
+        if api_settings.BLACKLIST_AFTER_ROTATION and is_token_blacklisted(token.get(api_settings.JTI_CLAIM)):
+            raise ValidationError("Token is blacklisted")
+        return {}
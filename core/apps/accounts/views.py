@@ -3,21 +3,25 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from apps.accounts.cache import TOKEN_VERSION_CLAIM
 from apps.accounts.serializers import CreateUserSerializer, MyTokenObtainPairSerializer
 
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
+    throttle_scope = 'auth'
 
 
 class RegisterAPIView(APIView):
     serializer_class = CreateUserSerializer
+    throttle_scope = 'auth'
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
             refresh = RefreshToken.for_user(user)
+            refresh[TOKEN_VERSION_CLAIM] = user.token_version
 
             if user.is_staff:
                 refresh.payload.update({'group': 'admin'})
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.common.utils import generate_tx_ref, generate_unique_code
+from apps.profiles.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Измеряет стоимость генерации ссылок на транзакцию при конкурентной нагрузке.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20000, help='Количество ссылок на один поток.')
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16], help='Количество потоков.')
+        parser.add_argument(
+            '--legacy', action='store_true',
+            help='Также измерить generate_unique_code (случайный код + запрос exists() к таблице заказов).',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        generators = [('generate_tx_ref', self.run_tx_ref)]
+        if options['legacy']:
+            generators.append(('generate_unique_code', self.run_legacy))
+        self.stdout.write(f"{'generator':<22}{'threads':>8}{'codes':>10}{'codes/s':>14}{'us/code':>10}{'unique':>8}")
+        for name, run in generators:
+            for threads in options['threads']:
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    chunks = list(executor.map(run, [count] * threads))
+                elapsed = time.perf_counter() - started
+                codes = [code for chunk in chunks for code in chunk]
+                unique = len(set(codes)) == len(codes)
+                self.stdout.write(
+                    f'{name:<22}{threads:>8}{len(codes):>10}{len(codes) / elapsed:>14.0f}'
+                    f'{elapsed / len(codes) * threads * 1e6:>10.2f}{str(unique):>8}'
+                )
+
+    def run_tx_ref(self, count):
+        return [generate_tx_ref() for _ in range(count)]
+
+    def run_legacy(self, count):
+        try:
+            return [generate_unique_code(Order, 'tx_ref') for _ in range(count)]
+        finally:
+            connection.close()
@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик (REPLICA_DATABASES) через backup API SQLite. '
+        'Заменяет репликацию при локальной проверке чтения с реплик; для PostgreSQL используйте '
+        'встроенную потоковую репликацию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять копирование каждые N секунд (по умолчанию - один раз).')
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError('sync_replicas supports only SQLite databases.')
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replicas configured (set DB_REPLICAS).')
+        while True:
+            started = time.perf_counter()
+            primary.ensure_connection()
+            for alias in settings.REPLICA_DATABASES:
+                #  Копия согласована: backup API читает основную базу в одной транзакции чтения,
+                #  а читатели реплики видят либо прежнее, либо новое ее состояние.
+                target = sqlite3.connect(connections[alias].settings_dict['NAME'], timeout=30)
+                try:
+                    primary.connection.backup(target)
+                finally:
+                    target.close()
+            primary.close()
+            self.stdout.write(
+                f'Synced {len(settings.REPLICA_DATABASES)} replica(s) in {time.perf_counter() - started:.3f}s')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -1,6 +1,49 @@
-from rest_framework.pagination import PageNumberPagination
+import heapq
+from itertools import islice
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'page_size'  # Параметр запроса для изменения размера страницы
     max_page_size = 100  # Максимально допустимый размер страницы
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по created_at (от новых к старым). В отличие от постраничной не выполняет COUNT
+    и не замедляется на дальних страницах: каждая страница выбирается по индексу условием created_at < курсор.
+    """
+    ordering = '-created_at'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class MergedQuerySet:
+    """
+    Несколько querysets с одинаковыми полями, которые курсорная пагинация обходит как один отсортированный список
+    (например, заказы из основной и архивной таблиц). Поддерживает только то, что использует CursorPagination:
+    order_by, filter и срез. Для среза [a:b] из каждого queryset читается не более b строк,
+    после чего строки сливаются по полю сортировки.
+    """
+
+    def __init__(self, *querysets, ordering=None):
+        self.querysets = querysets
+        self.ordering = ordering
+
+    def order_by(self, *ordering):
+        return MergedQuerySet(*(queryset.order_by(*ordering) for queryset in self.querysets), ordering=ordering)
+
+    def filter(self, *args, **kwargs):
+        return MergedQuerySet(*(queryset.filter(*args, **kwargs) for queryset in self.querysets),
+                              ordering=self.ordering)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.stop is None:
+            raise TypeError('MergedQuerySet supports only slices with an upper bound')
+        order = self.ordering[0]
+        attr = order.lstrip('-')
+        merged = heapq.merge(*(list(queryset[:key.stop]) for queryset in self.querysets),
+                             key=lambda obj: getattr(obj, attr), reverse=order.startswith('-'))
+        return list(islice(merged, key.start or 0, key.stop))
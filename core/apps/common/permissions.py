@@ -1,6 +1,26 @@
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import permissions
 
 
+def get_request_seller(request):
+    """
+    Возвращает одобренный профиль продавца текущего пользователя или None.
+
+    Профиль загружается один раз за запрос и запоминается в объекте запроса, поэтому IsSeller
+    и представление продавца используют один и тот же объект. Пользователь из CachedJWTAuthentication
+    уже загружен вместе с профилем (select_related('seller')), и обращение к базе данных не требуется.
+    """
+    if not hasattr(request, '_approved_seller'):
+        seller = None
+        if request.user.is_authenticated:
+            try:
+                seller = request.user.seller
+            except ObjectDoesNotExist:
+                pass
+        request._approved_seller = seller if seller is not None and seller.is_approved else None
+    return request._approved_seller
+
+
 class IsOwner(permissions.BasePermission):
     #  Этот метод проверяет, имеет ли пользователь право доступа к представлению в целом.
     #  Он вызывается перед тем, как DRF попытается получить доступ к конкретному объекту.
@@ -16,10 +36,13 @@ class IsOwner(permissions.BasePermission):
 
 
 class IsSeller(permissions.BasePermission):
+    #  Доступ есть у администратора и у продавца с одобренным профилем.
     def has_permission(self, request, view):
-        if (request.user.is_authenticated and request.user.account_type == 'SELLER') or request.user.is_staff:
+        if request.user.is_authenticated and request.user.is_staff:
             return True
-        return False
+        return (request.user.is_authenticated and request.user.account_type == 'SELLER'
+                and get_request_seller(request) is not None)
 
     def has_object_permission(self, request, view, obj):
-        return obj.seller == request.user.seller or request.user.is_staff
+        seller = get_request_seller(request)
+        return (seller is not None and obj.seller_id == seller.id) or request.user.is_staff
@@ -0,0 +1,87 @@
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+#  Списки параметров разной длины (IN (%s, %s, ...)) дают один и тот же отпечаток.
+_PARAMS_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+def query_fingerprint(sql):
+    #  Отпечаток запроса - его текст с плейсхолдерами вместо значений параметров.
+    return _PARAMS_LIST.sub('%s, ...', ' '.join(sql.split()))
+
+
+class QueryStats:
+    """
+    Счетчик запросов к базе данных для execute_wrapper: количество, суммарное время
+    и количество выполнений каждого отпечатка запроса.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[query_fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        #  Отпечатки, выполненные в запросе больше одного раза (обычно признак N+1).
+        return {fingerprint: count for fingerprint, count in self.fingerprints.most_common() if count > 1}
+
+
+class QueryStatsMiddleware:
+    """
+    Считает запросы к базе данных, их суммарное время и повторяющиеся запросы для каждого HTTP-запроса.
+
+    При DEBUG результаты добавляются в заголовки ответа X-DB-Query-Count, X-DB-Query-Time (мс)
+    и X-DB-Duplicate-Queries (короткие хеши отпечатков с количеством выполнений). Иначе они пишутся
+    в лог apps.common.query_stats полями db_query_count, db_query_time_ms и db_duplicate_queries.
+    Запросы, выполненные при отдаче потокового ответа, не учитываются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_STATS_ENABLED:
+            return self.get_response(request)
+        stats = QueryStats()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        duplicates = stats.duplicates
+        time_ms = round(stats.duration * 1000, 2)
+        if settings.DEBUG:
+            response['X-DB-Query-Count'] = str(stats.count)
+            response['X-DB-Query-Time'] = str(time_ms)
+            response['X-DB-Duplicate-Queries'] = ', '.join(
+                f'{hashlib.sha1(fingerprint.encode()).hexdigest()[:8]}*{count}'
+                for fingerprint, count in duplicates.items()
+            )
+        else:
+            logger.info('%s %s: %s queries in %s ms', request.method, request.path, stats.count, time_ms, extra={
+                'method': request.method,
+                'path': request.path,
+                'status_code': response.status_code,
+                'db_query_count': stats.count,
+                'db_query_time_ms': time_ms,
+                'db_duplicate_queries': duplicates,
+            })
+        return response
@@ -0,0 +1,86 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.common.throttling import get_client_ident
+
+REPLICA_STICKY_CACHE_KEY = 'replicas:sticky:{}'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+#  Разрешено ли читать с реплик в текущем контексте. По умолчанию нет: фоновые задачи, команды
+#  и запросы на запись читают с основной базы, чтобы видеть только что записанные данные.
+_use_replicas = ContextVar('use_replicas', default=False)
+
+
+@contextmanager
+def read_from_replicas(enabled=True):
+    token = _use_replicas.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replicas.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение на реплики (настройка REPLICA_DATABASES), а запись и миграции - на основную базу.
+
+    Реплики используются только внутри read_from_replicas(), который включает ReplicaMiddleware
+    для запросов на чтение. Реплика выбирается случайно для каждого запроса к базе данных.
+
+    Данные, которые записываются в общий кеш (продукты, остатки, пользователи, черный список токенов),
+    читаются явно через .using('default'): иначе устаревшая копия с реплики прожила бы в кеше
+    дольше задержки репликации.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.REPLICA_DATABASES and _use_replicas.get():
+            return random.choice(settings.REPLICA_DATABASES)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        #  Реплики содержат копию основной базы, поэтому связи между объектами из них допустимы.
+        databases = {'default', *settings.REPLICA_DATABASES}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        #  Схема реплик обновляется репликацией с основной базы.
+        return db == 'default'
+
+
+class ReplicaMiddleware:
+    """
+    Включает чтение с реплик для запросов GET, HEAD и OPTIONS.
+
+    После запроса на запись клиент в течение REPLICA_STICKY_SECONDS читает с основной базы, чтобы сразу
+    видеть свои изменения, даже если реплика отстает. Отметка ставится и для IP-адреса, и для пользователя
+    из JWT: после регистрации или входа без токена следующий запрос уже с токеном тоже читает с основной базы.
+    Для нескольких процессов приложения кеш должен быть общим.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def sticky_keys(request):
+        idents = {f"ip:{request.META.get('REMOTE_ADDR')}", get_client_ident(request)}
+        return [REPLICA_STICKY_CACHE_KEY.format(ident) for ident in sorted(idents)]
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+        keys = self.sticky_keys(request)
+        if request.method not in SAFE_METHODS:
+            #  Отметка ставится до обработки запроса: чтения, начатые параллельно с записью, тоже идут
+            #  на основную базу.
+            cache.set_many(dict.fromkeys(keys, True), settings.REPLICA_STICKY_SECONDS)
+            return self.get_response(request)
+        with read_from_replicas(not cache.get_many(keys)):
+            return self.get_response(request)
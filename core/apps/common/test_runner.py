@@ -0,0 +1,23 @@
+import logging
+import os
+
+from django.test.runner import DiscoverRunner
+
+
+class QuietQueryStatsTestRunner(DiscoverRunner):
+    """
+    Стандартный запуск тестов, при котором лог apps.common.query_stats (строка на каждый HTTP-запрос)
+    не перемешивается с выводом тестов. Уровень, заданный переменной окружения QUERY_STATS_LOG_LEVEL,
+    не изменяется.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._query_stats_logger = logging.getLogger('apps.common.query_stats')
+        self._query_stats_level = self._query_stats_logger.level
+        if 'QUERY_STATS_LOG_LEVEL' not in os.environ:
+            self._query_stats_logger.setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        self._query_stats_logger.setLevel(self._query_stats_level)
+        super().teardown_test_environment(**kwargs)
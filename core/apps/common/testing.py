@@ -0,0 +1,94 @@
+import itertools
+import os
+import tempfile
+
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.models import User
+from apps.profiles.models import Order, OrderItem
+from apps.sellers.models import Seller
+from apps.shop.models import Category, Product
+
+_sequence = itertools.count()
+
+#  Файловый кеш, общий для всех процессов, в отличие от кеша в памяти процесса из настроек.
+#  Нужен тестам поведения, которое включается только с общим кешем (см. is_shared_cache).
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'core-tests-cache'),
+    }
+}
+
+
+def create_user(email=None, **kwargs):
+    email = email or f'user{next(_sequence)}@example.com'
+    return User.objects.create_user('Test', 'User', email, 'password', **kwargs)
+
+
+def create_seller(email=None, is_approved=True):
+    user = create_user(email, account_type='SELLER')
+    return Seller.objects.create(
+        user=user, business_name=user.email, inn_identification_number='0', phone_number='0',
+        business_description='-', business_address='-', city='-', postal_code='0', bank_name='-',
+        bank_bic_number=0, bank_account_number='0', bank_routing_number='0', is_approved=is_approved,
+    )
+
+
+def create_category():
+    return Category.objects.create(name=f'Category {next(_sequence)}', image='category.jpg')
+
+
+def create_product(seller=None, category=None, **kwargs):
+    return Product.objects.create(
+        seller=seller, category=category, name=f'Product {next(_sequence)}', desc='-',
+        price_current=kwargs.pop('price_current', 1), image1='product.jpg', **kwargs,
+    )
+
+
+def create_order(user, products):
+    #  Оформленный заказ с одной позицией на каждый товар.
+    order = Order.objects.create(user=user, subtotal=len(products), total=len(products))
+    OrderItem.objects.bulk_create([
+        OrderItem(user=user, order=order, product=product, quantity=1, unit_price=product.price_current,
+                  line_total=product.price_current)
+        for product in products
+    ])
+    return order
+
+
+def jwt_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+class QueryBudgetMixin:
+    """
+    Примесь к TestCase для проверки, что число запросов к базе данных у конечной точки не зависит
+    от количества строк в ответе (нет N+1).
+    """
+
+    def assertQueryBudget(self, budget, create_rows, request, sizes=(1, 100)):
+        """
+        Проверяет, что request() выполняет ровно budget запросов при каждом количестве строк из sizes.
+
+        Args:
+            budget (int): Допустимое количество запросов.
+            create_rows (callable): Создает указанное количество новых строк для ответа.
+            request (callable): Выполняет запрос к конечной точке и возвращает ответ.
+            sizes (tuple): Количества строк, при которых выполняется проверка.
+        """
+        created = 0
+        for size in sizes:
+            create_rows(size - created)
+            created = size
+            #  Кеши продуктов и пользователей сбрасываются, чтобы измерять запрос без прогретого кеша.
+            cache.clear()
+            with self.subTest(rows=size), self.assertNumQueries(budget):
+                response = request()
+                #  Потоковый ответ читается внутри проверки: его строки запрашиваются при чтении ответа.
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                self.assertEqual(response.status_code, 200, content)
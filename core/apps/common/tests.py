@@ -1,3 +1,119 @@
-from django.test import TestCase
+import os
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connections, router
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.common.query_stats import query_fingerprint
+from apps.common.replicas import read_from_replicas
+from apps.common.testing import create_category, create_product
+from apps.common.utils import TxRefGenerator
+from apps.shop.cache import get_cached_products
+from apps.shop.models import Product
+
+REPLICA = 'replica_test'
+
+
+class QueryStatsMiddlewareTest(TestCase):
+
+    def test_fingerprint_ignores_parameter_list_length(self):
+        self.assertEqual(query_fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+                         query_fingerprint('SELECT *  FROM t WHERE id IN (%s,%s, %s)'))
+
+    @override_settings(DEBUG=True)
+    def test_debug_headers(self):
+        create_product()
+        response = self.client.get('/shop/products/')
+        self.assertEqual(response['X-DB-Query-Count'], '2')
+        self.assertGreaterEqual(float(response['X-DB-Query-Time']), 0)
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '')
+
+    @override_settings(DEBUG=False)
+    def test_production_log_fields(self):
+        with self.assertLogs('apps.common.query_stats', 'INFO') as logs:
+            self.client.get('/shop/products/')
+        self.assertEqual(logs.records[0].db_query_count, 1)
+        self.assertEqual(logs.records[0].db_duplicate_queries, {})
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    Реплика в тестах - зеркало тестовой базы (TEST MIRROR), поэтому видит те же данные, а запросы
+    к ней учитываются отдельно от запросов к default. Псевдоним добавляется в setUpClass, поэтому
+    databases = '__all__' (список баз для тестового запуска собирается до создания псевдонима).
+    """
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        settings_dict = connections['default'].settings_dict
+        connections.settings[REPLICA] = {**settings_dict, 'TEST': {**settings_dict['TEST'], 'MIRROR': 'default'}}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        cache.clear()
+        self.category = create_category()
+
+    def get_categories(self, **extra):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get('/shop/categories/', **extra)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_router_uses_replicas_only_inside_read_from_replicas(self):
+        self.assertEqual(router.db_for_read(Product), 'default')
+        with read_from_replicas():
+            self.assertEqual(router.db_for_read(Product), REPLICA)
+            self.assertEqual(router.db_for_write(Product), 'default')
+        self.assertFalse(router.allow_migrate(REPLICA, 'shop'))
+
+    def test_reads_go_to_replica(self):
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get('/shop/categories/')
+        self.assertEqual([category['slug'] for category in response.data], [self.category.slug])
+        self.assertEqual(len(replica), 1)
+
+    def test_write_makes_client_sticky(self):
+        self.client.post('/shop/cart/', {'slug': 'missing'})
+        self.assertEqual(self.get_categories(), (1, 0))
+        #  Другой клиент продолжает читать с реплики.
+        self.assertEqual(self.get_categories(REMOTE_ADDR='10.0.0.2'), (0, 1))
+
+    def test_anonymous_write_makes_token_requests_sticky(self):
+        response = self.client.post('/auth/', {'email': 'new@example.com', 'password': 'Secr3t!pass'})
+        self.assertEqual(response.status_code, 201)
+        # Загрузка пользователя при аутентификации и сам список категорий идут в primary
+        self.assertEqual(self.get_categories(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}"), (2, 0))
+
+    def test_cache_refill_reads_primary(self):
+        product = create_product()
+        with read_from_replicas(), CaptureQueriesContext(connections[REPLICA]) as replica:
+            self.assertIn(str(product.pk), get_cached_products([product.pk]))
+        self.assertEqual(len(replica), 0)
+
+
+class TxRefGeneratorTest(TestCase):
+
+    @override_settings(TX_REF_NODE_ID=5)
+    def test_configured_node_id_includes_pid(self):
+        generator = TxRefGenerator()
+        self.assertEqual(generator.node_id >> TxRefGenerator.PID_BITS, 5)
+        self.assertEqual(generator.node_id & ((1 << TxRefGenerator.PID_BITS) - 1), os.getpid())
+
+    def test_reset_recreates_lock(self):
+        generator = TxRefGenerator()
+        lock = generator._lock
+        lock.acquire()
+        generator.reset()
+        self.assertIsNot(generator._lock, lock)
+        self.assertEqual(len(generator()), TxRefGenerator.LENGTH)
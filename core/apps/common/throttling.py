@@ -0,0 +1,142 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.state import token_backend
+
+THROTTLE_CACHE_KEY = 'throttle:{}:{}'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """
+    Разбирает ограничение вида '120/min' (как в DRF: s, m, h, d по первой букве периода).
+
+    Возвращает:
+        tuple: Емкость корзины токенов и скорость ее пополнения (токенов в секунду).
+    """
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+def _refill(state, capacity, refill_rate, now):
+    #  Пополняет корзину за прошедшее время и берет один токен. Возвращает новое состояние
+    #  и сколько секунд ждать, если токена нет (0 - запрос разрешен).
+    tokens, updated = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * refill_rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / refill_rate
+
+
+class MemoryBucketStore:
+    """
+    Корзины токенов в памяти процесса. Хранится не больше THROTTLE_MAX_KEYS корзин: при переполнении
+    удаляются давно не использованные. Ограничение действует на каждый процесс отдельно.
+    """
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        with self._lock:
+            state, wait = _refill(self._buckets.pop(key, None), capacity, refill_rate, time.monotonic())
+            self._buckets[key] = state
+            if len(self._buckets) > settings.THROTTLE_MAX_KEYS:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class CacheBucketStore:
+    """
+    Корзины токенов в кеше THROTTLE_CACHE_ALIAS, общем для всех процессов и узлов.
+
+    Чтение и запись состояния не атомарны, поэтому при одновременных запросах одного клиента
+    на разных процессах ограничение может быть превышено на несколько запросов.
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def consume(self, key, capacity, refill_rate):
+        state, wait = _refill(self.cache.get(key), capacity, refill_rate, time.time())
+        #  Запись живет, пока корзина не пополнится полностью: после этого она не отличается от новой.
+        self.cache.set(key, state, math.ceil(capacity / refill_rate) + 1)
+        return wait
+
+
+def get_throttle_scope(view_func, method):
+    """
+    Группа ограничений представления: атрибут throttle_scope класса представления.
+    Это строка или словарь {HTTP-метод: группа} для разных ограничений на чтение и запись.
+    """
+    view_class = getattr(view_func, 'view_class', None)
+    scope = getattr(view_class, 'throttle_scope', None)
+    if isinstance(scope, dict):
+        return scope.get(method)
+    return scope
+
+
+def get_client_ident(request):
+    """
+    Идентификатор клиента: id пользователя из JWT, если токен передан, иначе IP-адрес.
+    Вычисляется один раз за запрос и запоминается в объекте запроса.
+
+    Проверяется только подпись и срок действия токена, без обращений к базе данных:
+    токен, отозванный в черном списке, все равно будет отклонен при аутентификации.
+    """
+    if not hasattr(request, '_client_ident'):
+        ident = f"ip:{request.META.get('REMOTE_ADDR')}"
+        header = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(header) == 2 and header[0] in api_settings.AUTH_HEADER_TYPES:
+            try:
+                payload = token_backend.decode(header[1], verify=True)
+            except TokenBackendError:
+                payload = {}
+            user_id = payload.get(api_settings.USER_ID_CLAIM)
+            if user_id is not None:
+                ident = f'user:{user_id}'
+        request._client_ident = ident
+    return request._client_ident
+
+
+class ThrottleMiddleware:
+    """
+    Ограничивает частоту запросов к представлениям по группам (настройка THROTTLE_RATES) алгоритмом
+    корзины токенов. Проверка выполняется в process_view, то есть до аутентификации и запросов
+    к базе данных в представлении. При превышении возвращается 429 с заголовком Retry-After.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.store = import_string(settings.THROTTLE_STORE)()
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.THROTTLE_ENABLED:
+            return None
+        scope = get_throttle_scope(view_func, request.method)
+        rate = settings.THROTTLE_RATES.get(scope)
+        if rate is None:
+            return None
+        capacity, refill_rate = parse_rate(rate)
+        wait = self.store.consume(THROTTLE_CACHE_KEY.format(scope, get_client_ident(request)), capacity, refill_rate)
+        if not wait:
+            return None
+        retry_after = math.ceil(wait)
+        response = JsonResponse(
+            {'detail': f'Request was throttled. Expected available in {retry_after} seconds.'}, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -1,4 +1,12 @@
+import hashlib
+import os
 import secrets
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
 
 from apps.common.models import BaseModel
 
@@ -24,6 +32,103 @@ def generate_unique_code(model: BaseModel, field: str) -> str:
     return generate_unique_code(model, field)
 
 
+#  Алфавит Crockford base32: без букв I, L, O, U, которые легко спутать с цифрами.
+TX_REF_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+class TxRefGenerator:
+    """
+    Генератор ссылок на транзакцию, уникальных по построению, без запросов к базе данных.
+
+    Ссылка - это 100-битное число, записанное 20 символами base32:
+        48 бит - время в миллисекундах (ссылки упорядочены по времени создания),
+        32 бита - идентификатор узла: 10 бит настройки TX_REF_NODE_ID и 22 бита PID процесса
+                  (или хеш имени хоста и PID, если настройка не задана),
+        20 бит - последовательность внутри миллисекунды, начинающаяся со случайного значения.
+
+    С заданным TX_REF_NODE_ID идентификаторы узлов разных процессов различаются по построению (PID в Linux
+    не превышает 22 бит). Без настройки два процесса могут получить одинаковую ссылку только при совпадении
+    хеша, миллисекунды и значения последовательности; такой заказ сохраняется повторно с новой ссылкой
+    (Order.save).
+    """
+    TIME_BITS = 48
+    NODE_BITS = 32
+    PID_BITS = 22
+    SEQUENCE_BITS = 20
+    LENGTH = 20
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        #  После fork блокировка могла остаться захваченной другим потоком родителя, поэтому создается заново.
+        self._lock = threading.Lock()
+        self.node_id = self._get_node_id()
+        self._last_ms = -1
+        self._sequence = 0
+        self._sequence_start = 0
+
+    def _get_node_id(self):
+        host_id = getattr(settings, 'TX_REF_NODE_ID', None)
+        if host_id is None:
+            seed = f'{socket.gethostname()}:{uuid.getnode()}:{os.getpid()}'.encode()
+            return int.from_bytes(hashlib.blake2b(seed, digest_size=4).digest(), 'big')
+        #  Несколько процессов одного хоста используют одну настройку, поэтому к ней добавляется PID.
+        host_bits = self.NODE_BITS - self.PID_BITS
+        return ((host_id & ((1 << host_bits) - 1)) << self.PID_BITS) | (os.getpid() & ((1 << self.PID_BITS) - 1))
+
+    def _next(self):
+        sequence_mask = (1 << self.SEQUENCE_BITS) - 1
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            #  Если часы отстали (например, после синхронизации времени), продолжаем с последней миллисекунды.
+            now_ms = max(now_ms, self._last_ms)
+            if now_ms != self._last_ms:
+                self._last_ms = now_ms
+                self._sequence_start = self._sequence = secrets.randbits(self.SEQUENCE_BITS)
+            else:
+                self._sequence = (self._sequence + 1) & sequence_mask
+                #  Последовательность исчерпана в этой миллисекунде - переходим к следующей.
+                if self._sequence == self._sequence_start:
+                    self._last_ms += 1
+                    self._sequence_start = self._sequence = secrets.randbits(self.SEQUENCE_BITS)
+            return self._last_ms, self._sequence
+
+    def __call__(self) -> str:
+        timestamp, sequence = self._next()
+        value = (timestamp << (self.NODE_BITS + self.SEQUENCE_BITS)) | (self.node_id << self.SEQUENCE_BITS) | sequence
+        chars = []
+        for _ in range(self.LENGTH):
+            chars.append(TX_REF_ALPHABET[value & 31])
+            value >>= 5
+        return ''.join(reversed(chars))
+
+
+generate_tx_ref = TxRefGenerator()
+#  После fork дочерний процесс получает собственный идентификатор узла и последовательность.
+os.register_at_fork(after_in_child=generate_tx_ref.reset)
+
+
+#  Бэкенды кеша, данные которых не видны другим процессам (или не хранятся вовсе).
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias='default'):
+    """
+    Проверяет, что кеш с указанным alias общий для всех процессов приложения.
+
+    Args:
+        alias (str): Имя кеша в настройке CACHES.
+
+    Возвращает:
+        bool: False для кеша в памяти процесса и для DummyCache.
+    """
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
 #  set_dict_attr позволяет обновлять атрибуты объекта динамически, используя данные из словаря
 #  если количество атрибутов, которые нужно обновить, неизвестно заранее или меняется.
 #  Вместо множественного присваивания user.attr1 = ..., user.attr2 = ... и т.д., используется один вызов set_dict_attr
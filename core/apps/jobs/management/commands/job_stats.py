@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Выводит глубину очереди фоновых задач.'
+
+    def handle(self, *args, **options):
+        depth = Job.objects.depth()
+        for status, count in depth['counts'].items():
+            self.stdout.write(f'{status:<10}{count:>10}')
+        self.stdout.write(f"Oldest ready job waits {depth['oldest_pending_seconds']:.1f}s")
@@ -0,0 +1,45 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.jobs.process import init_worker_process
+from apps.jobs.worker import claim_jobs, execute_job, release_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчик фоновых задач с пулом процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOBS_WORKER_PROCESSES,
+                            help='Количество процессов, выполняющих задачи.')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL,
+                            help='Пауза (в секундах) между проверками очереди, когда она пуста.')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить задачи, готовые к выполнению, и завершить работу.')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        context = multiprocessing.get_context('spawn')
+        running = set()
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                                 initializer=init_worker_process) as executor:
+            self.stdout.write(f'Job worker started with {processes} process(es)')
+            try:
+                while True:
+                    release_stale_jobs()
+                    #  Берем из очереди не больше задач, чем есть свободных процессов.
+                    for job_id in claim_jobs(processes - len(running)):
+                        running.add(executor.submit(execute_job, job_id))
+                    if running:
+                        done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self.stdout.write(f'Job finished: {future.result()}')
+                    elif options['once']:
+                        break
+                    else:
+                        time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping job worker, waiting for running jobs')
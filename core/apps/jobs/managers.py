@@ -0,0 +1,27 @@
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from apps.common.managers import GetOrNoneManager
+
+
+class JobManager(GetOrNoneManager):
+
+    def enqueue(self, func, **payload):
+        return self.enqueue_many([(func, payload)])[0]
+
+    #  Ставит несколько задач в очередь одним запросом INSERT. Если вызывается внутри транзакции,
+    #  задачи станут видны обработчику только после ее фиксации.
+    def enqueue_many(self, jobs):
+        return self.bulk_create([self.model(name=func.job_name, payload=payload) for func, payload in jobs])
+
+    def depth(self):
+        """
+        Возвращает состояние очереди: количество задач по статусам и возраст самой старой ожидающей задачи.
+        """
+        counts = dict(self.values_list('status').annotate(count=Count('id')).order_by())
+        oldest = self.filter(status=self.model.PENDING, run_at__lte=timezone.now()).aggregate(
+            oldest=Min('run_at'))['oldest']
+        return {
+            'counts': {status: counts.get(status, 0) for status, _ in self.model.STATUS_CHOICES},
+            'oldest_pending_seconds': (timezone.now() - oldest).total_seconds() if oldest else 0,
+        }
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from apps.common.models import BaseModel
+from apps.jobs.managers import JobManager
+
+
+def default_max_attempts():
+    return settings.JOBS_MAX_ATTEMPTS
+
+
+class Job(BaseModel):
+    """
+    Фоновая задача, сохраненная в базе данных и выполняемая командой run_jobs.
+
+    Атрибуты:
+        name (str): Имя зарегистрированной задачи (см. apps.jobs.registry.job).
+        payload (dict): Именованные аргументы задачи.
+        status (str): Статус задачи.
+        attempts (int): Количество уже сделанных попыток выполнения.
+        max_attempts (int): Максимальное количество попыток, после которого задача считается проваленной.
+        run_at (DateTimeField): Время, раньше которого задача не будет выполнена (используется для повторов).
+        locked_at (DateTimeField): Время, когда обработчик взял задачу в работу.
+        finished_at (DateTimeField): Время завершения задачи.
+        last_error (str): Текст последней ошибки.
+    """
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    SUCCESS = 'SUCCESS'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = (
+        (PENDING, 'PENDING'),
+        (RUNNING, 'RUNNING'),
+        (SUCCESS, 'SUCCESS'),
+        (FAILED, 'FAILED'),
+    )
+
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=default_max_attempts)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    objects = JobManager()
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            #  Индекс для выборки готовых к выполнению задач: status = PENDING AND run_at <= now.
+            models.Index(fields=['status', 'run_at'], name='jobs_job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
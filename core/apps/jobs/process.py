@@ -0,0 +1,8 @@
+import django
+
+
+#  Процессы пула запускаются методом spawn и не наследуют соединения с базой данных родителя,
+#  поэтому в каждом из них Django настраивается заново. Модуль не импортирует модели, так как
+#  инициализатор загружается в новом процессе до вызова django.setup().
+def init_worker_process():
+    django.setup()
@@ -0,0 +1,22 @@
+_registry = {}
+
+
+def job(name):
+    """
+    Декоратор, регистрирующий функцию как фоновую задачу под указанным именем.
+
+    Имя сохраняется в таблице задач, поэтому его не следует менять, пока в очереди есть задачи с этим именем.
+    Аргументы функции передаются как именованные и должны сериализоваться в JSON.
+    """
+    def decorator(func):
+        func.job_name = name
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_job_function(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'Фоновая задача {name} не зарегистрирована')
@@ -0,0 +1,84 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from apps.jobs.models import Job
+from apps.jobs.registry import get_job_function
+
+logger = logging.getLogger(__name__)
+
+
+def release_stale_jobs():
+    """
+    Возвращает в очередь задачи, которые слишком долго находятся в статусе RUNNING
+    (например, если обработчик был остановлен во время их выполнения).
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=stale_before).update(
+        status=Job.PENDING, locked_at=None)
+
+
+def claim_jobs(limit):
+    """
+    Забирает до limit готовых к выполнению задач.
+
+    Каждая задача захватывается условным UPDATE ... WHERE status = 'PENDING', поэтому несколько обработчиков
+    могут работать с одной таблицей: задачу получит только тот, чей UPDATE изменил строку.
+
+    Возвращает:
+        list: Идентификаторы захваченных задач.
+    """
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.PENDING, run_at__lte=now).values_list('id', flat=True)[:limit]
+    claimed = []
+    for job_id in candidates:
+        if Job.objects.filter(id=job_id, status=Job.PENDING).update(
+                status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1):
+            claimed.append(job_id)
+    return claimed
+
+
+def retry_delay(attempts):
+    #  Экспоненциальная задержка со случайным разбросом, чтобы повторы не выполнялись одновременно.
+    delay = settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return min(delay, settings.JOBS_RETRY_BACKOFF_MAX) * random.uniform(0.8, 1.2)
+
+
+def execute_job(job_id):
+    """
+    Выполняет захваченную задачу и сохраняет результат.
+
+    При ошибке задача возвращается в очередь с задержкой, пока не исчерпаны попытки,
+    после чего получает статус FAILED.
+
+    Возвращает:
+        str: Итоговый статус задачи.
+    """
+    close_old_connections()
+    job = Job.objects.get(id=job_id)
+    try:
+        get_job_function(job.name)(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+            logger.error('Job %s (%s) failed after %s attempts', job.id, job.name, job.attempts)
+        else:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            logger.warning('Job %s (%s) failed, retrying at %s', job.id, job.name, job.run_at)
+    else:
+        job.status = Job.SUCCESS
+        job.finished_at = timezone.now()
+    job.locked_at = None
+    job.save(update_fields=['status', 'run_at', 'locked_at', 'finished_at', 'last_error', 'updated_at'])
+    return job.status
@@ -0,0 +1,35 @@
+from django.db import transaction
+
+from apps.profiles.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+
+def _copied_fields(archive_model):
+    #  Поля архивной модели, которые переносятся из исходной таблицы (у них одинаковые имена столбцов).
+    return [field.attname for field in archive_model._meta.concrete_fields if field.name != 'archived_at']
+
+
+def archive_batch(delivered_before, batch_size):
+    """
+    Переносит в архив до batch_size заказов, доставленных раньше delivered_before, вместе с позициями.
+
+    Строки копируются и удаляются одной транзакцией, без создания экземпляров исходных моделей.
+
+    Возвращает:
+        tuple: Количество перенесенных заказов и позиций.
+    """
+    with transaction.atomic():
+        order_ids = list(
+            Order.objects.select_for_update()
+            .filter(delivery_status='SUCCESS', date_delivered__lt=delivered_before)
+            .order_by('date_delivered').values_list('id', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return 0, 0
+        orders = Order.objects.filter(id__in=order_ids).values(*_copied_fields(ArchivedOrder))
+        items = OrderItem.objects.filter(order_id__in=order_ids).values(*_copied_fields(ArchivedOrderItem))
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**row) for row in orders])
+        archived_items = ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**row) for row in items])
+        #  Позиции удаляются первыми, поэтому удаление заказов не загружает их для каскада.
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(id__in=order_ids).delete()
+    return len(order_ids), len(archived_items)
@@ -0,0 +1,88 @@
+import csv
+import datetime
+import heapq
+
+from django.utils import timezone
+
+from apps.profiles.models import ArchivedOrderItem, OrderItem
+
+#  Столбцы выгрузки: заголовок CSV и соответствующее поле позиции заказа.
+EXPORT_COLUMNS = (
+    ('tx_ref', 'order__tx_ref'),
+    ('created_at', 'order__created_at'),
+    ('delivery_status', 'order__delivery_status'),
+    ('payment_status', 'order__payment_status'),
+    ('date_delivered', 'order__date_delivered'),
+    ('customer_email', 'order__user__email'),
+    ('full_name', 'order__full_name'),
+    ('country', 'order__country'),
+    ('city', 'order__city'),
+    ('seller', 'product__seller__business_name'),
+    ('product_slug', 'product__slug'),
+    ('product_name', 'product__name'),
+    ('quantity', 'quantity'),
+    ('unit_price', 'unit_price'),
+    ('line_total', 'line_total'),
+)
+
+
+#  Символы, с которых табличные редакторы начинают формулу. Такие значения выгружаются с префиксом ',
+#  чтобы текст из заказа (имя, город) не выполнялся как формула при открытии файла.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def escape_formula(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def day_start(day):
+    #  Начало дня в текущем часовом поясе: границы периода сравниваются с created_at без приведения к дате,
+    #  поэтому может использоваться индекс по created_at.
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+class Echo:
+    #  Псевдо-файл для csv.writer: вместо записи возвращает строку, которую можно сразу отправить клиенту.
+    def write(self, value):
+        return value
+
+
+def _lines(model, seller=None, start=None, end=None, delivery_status=None, payment_status=None, chunk_size=2000):
+    lines = model.objects.filter(order__isnull=False)
+    if seller is not None:
+        lines = lines.filter(product__seller=seller)
+    #  Период полуоткрытый: [начало дня start, начало дня после end).
+    if start:
+        lines = lines.filter(order__created_at__gte=day_start(start))
+    if end and end < datetime.date.max:
+        lines = lines.filter(order__created_at__lt=day_start(end + datetime.timedelta(days=1)))
+    if delivery_status:
+        lines = lines.filter(order__delivery_status=delivery_status)
+    if payment_status:
+        lines = lines.filter(order__payment_status=payment_status)
+    return (
+        lines.order_by('order__created_at', 'order_id', 'id')
+        .values_list(*(field for _, field in EXPORT_COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def iter_order_lines_csv(**filters):
+    """
+    Генератор строк CSV с позициями заказов из основной и архивной таблиц, по возрастанию даты заказа.
+
+    Строки читаются курсором частями по chunk_size, а две таблицы сливаются по дате по мере чтения,
+    поэтому расход памяти не зависит от размера выгрузки. Заголовок отдается до первого запроса к базе данных.
+    Строковые значения, которые начинаются с символа формулы, экранируются (см. FORMULA_PREFIXES).
+
+    Args:
+        **filters: seller, start, end, delivery_status, payment_status, chunk_size.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    #  Второй столбец - дата заказа.
+    for row in heapq.merge(_lines(ArchivedOrderItem, **filters), _lines(OrderItem, **filters),
+                           key=lambda row: row[1]):
+        yield writer.writerow([escape_formula(value) for value in row])
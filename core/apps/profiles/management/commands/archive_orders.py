@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.profiles.archive import archive_batch
+
+
+class Command(BaseCommand):
+    help = 'Переносит доставленные заказы старше заданного возраста вместе с позициями в архивные таблицы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+                            help='Сколько дней после доставки заказ остается в основной таблице.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Сколько заказов переносится в одной транзакции.')
+
+    def handle(self, *args, **options):
+        delivered_before = timezone.now() - timedelta(days=options['days'])
+        total_orders = total_items = 0
+        while True:
+            orders, items = archive_batch(delivered_before, options['batch_size'])
+            if not orders:
+                break
+            total_orders += orders
+            total_items += items
+            self.stdout.write(f'Archived {orders} order(s), {items} item(s)')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total_orders} order(s) and {total_items} item(s) in total'))
@@ -0,0 +1,163 @@
+import hashlib
+import uuid
+
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.common.managers import GetOrNoneManager
+
+
+#  Поля адреса доставки, из которых строится address_hash.
+ADDRESS_HASH_FIELDS = ('full_name', 'email', 'phone', 'address', 'city', 'country', 'zipcode')
+
+
+def make_address_hash(data):
+    """
+    Хеш нормализованного адреса доставки: значения полей ADDRESS_HASH_FIELDS без лишних пробелов
+    и без учета регистра. Адреса, которые отличаются только написанием, получают одинаковый хеш.
+    """
+    values = []
+    for field in ADDRESS_HASH_FIELDS:
+        value = data.get(field)
+        values.append('' if value is None else ' '.join(str(value).split()).casefold())
+    return hashlib.sha256('\x1f'.join(values).encode()).hexdigest()
+
+
+class ShippingAddressManager(GetOrNoneManager):
+
+    #  Возвращает сохраненный адрес пользователя с тем же содержимым или создает новый.
+    #  Поиск выполняется одним запросом по уникальному индексу (user, address_hash); если два одинаковых запроса
+    #  создают адрес одновременно, второй получит IntegrityError внутри get_or_create и вернет строку первого.
+    #  Возвращает кортеж (shipping_address, created).
+    def get_or_create_for_user(self, user, data):
+        return self.get_or_create(user=user, address_hash=make_address_hash(data), defaults=data)
+
+
+class OrderItemManager(GetOrNoneManager):
+
+    #  Колонки строки корзины в INSERT ... ON CONFLICT и соответствующие им поля модели.
+    UPSERT_FIELDS = (
+        ('id', 'id'), ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+        ('user_id', 'user'), ('product_id', 'product'), ('quantity', 'quantity'),
+    )
+
+    def _upsert_sql(self, connection, rows, only_changed=False):
+        """
+        Строит INSERT ... ON CONFLICT DO UPDATE для строк корзины.
+
+        Конфликт определяется частичным уникальным индексом (user, product) WHERE order IS NULL.
+        Значения приводятся к формату БД через сами поля модели (UUID в SQLite хранится как hex-строка).
+
+        Args:
+            connection: Соединение с базой данных.
+            rows (list): Кортежи значений в порядке UPSERT_FIELDS.
+            only_changed (bool): Обновлять только строки, у которых изменилось количество.
+
+        Возвращает:
+            tuple: (sql, params).
+        """
+        meta = self.model._meta
+        qn = connection.ops.quote_name
+        fields = [meta.get_field(name) for column, name in self.UPSERT_FIELDS]
+        params = [field.get_db_prep_save(value, connection) for row in rows for field, value in zip(fields, row)]
+        row_sql = f"({', '.join(['%s'] * len(fields))})"
+        sql = (
+            f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(column) for column, name in self.UPSERT_FIELDS)}) "
+            f"VALUES {', '.join([row_sql] * len(rows))} "
+            f"ON CONFLICT ({qn('user_id')}, {qn('product_id')}) WHERE {qn('order_id')} IS NULL "
+            f"DO UPDATE SET {qn('quantity')} = excluded.{qn('quantity')}, "
+            f"{qn('updated_at')} = excluded.{qn('updated_at')} "
+        )
+        if only_changed:
+            sql += f"WHERE {qn(meta.db_table)}.{qn('quantity')} <> excluded.{qn('quantity')} "
+        return sql, params
+
+    #  Добавляет/обновляет товар в корзине одним запросом INSERT ... ON CONFLICT DO UPDATE,
+    #  поэтому две параллельные попытки добавить один и тот же товар не создадут дубликатов.
+    #  Возвращает кортеж (orderitem, created).
+    def upsert_cart_item(self, user, product, quantity):
+        meta = self.model._meta
+        connection = connections[router.db_for_write(self.model)]
+        now = timezone.now()
+        new_id = uuid.uuid4()
+        sql, params = self._upsert_sql(connection, [(new_id, now, now, user.pk, product.pk, quantity)])
+        with connection.cursor() as cursor:
+            cursor.execute(sql + f"RETURNING {connection.ops.quote_name('id')}", params)
+            row_id = meta.get_field('id').to_python(cursor.fetchone()[0])
+        #  При вставке строка получает наш новый id, при обновлении остается id существующей строки.
+        created = row_id == new_id
+        orderitem = self.model(
+            id=row_id, user=user, order=None, product=product, quantity=quantity,
+            created_at=now if created else None, updated_at=now,
+        )
+        orderitem._state.adding = False
+        return orderitem, created
+
+    #  Добавляет/обновляет несколько товаров в корзине пакетными запросами INSERT ... ON CONFLICT DO UPDATE.
+    #  Строки, количество в которых не изменилось, не обновляются (updated_at остается прежним).
+    #  Параллельная вставка того же товара не приводит к IntegrityError: конфликт превращается в UPDATE.
+    def upsert_cart_items(self, user, quantities):
+        connection = connections[router.db_for_write(self.model)]
+        now = timezone.now()
+        rows = [(uuid.uuid4(), now, now, user.pk, product.pk, quantity) for product, quantity in quantities.items()]
+        batch_size = connection.ops.bulk_batch_size([name for column, name in self.UPSERT_FIELDS], rows) or len(rows)
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.execute(*self._upsert_sql(connection, rows[start:start + batch_size], only_changed=True))
+
+    #  Удаляет товар из корзины одним запросом DELETE. Возвращает True, если строка была удалена.
+    def remove_cart_item(self, user, product):
+        deleted, _ = self.filter(user=user, product=product, order=None).delete()
+        return bool(deleted)
+
+
+class OrderManager(GetOrNoneManager):
+
+    def transition_delivery_status(self, tx_refs, status, seller=None):
+        """
+        Переводит заказы с указанными tx_ref в статус доставки status одним запросом UPDATE.
+
+        Допустимость перехода проверяется в самом UPDATE условием delivery_status = <предыдущий статус>,
+        поэтому заказ, статус которого параллельно изменил другой запрос, не будет переведен.
+        При статусе SUCCESS также заполняется date_delivered.
+
+        Args:
+            tx_refs (list): Идентификаторы транзакций заказов.
+            status (str): Новый статус доставки (ключ DELIVERY_STATUS_TRANSITIONS).
+            seller (Seller): Если указан, изменяются только заказы, содержащие товары этого продавца.
+
+        Возвращает:
+            dict: {tx_ref: (результат, текущий статус)}, где результат - UPDATED, NOT_FOUND
+            или INVALID_TRANSITION.
+        """
+        from apps.profiles.models import DELIVERY_STATUS_TRANSITIONS, OrderItem
+
+        previous = DELIVERY_STATUS_TRANSITIONS[status]
+        orders = self.filter(tx_ref__in=tx_refs)
+        if seller is not None:
+            orders = orders.filter(Exists(OrderItem.objects.filter(order=OuterRef('pk'), product__seller=seller)))
+        now = timezone.now()
+        changes = {'delivery_status': status, 'updated_at': now}
+        if status == 'SUCCESS':
+            changes['date_delivered'] = now
+        with transaction.atomic():
+            #  Текущие статусы читаются как кортежи (без создания экземпляров модели) и блокируются до конца
+            #  транзакции, чтобы результат по каждому заказу совпадал с тем, что сделал UPDATE.
+            current = dict(orders.select_for_update().values_list('tx_ref', 'delivery_status'))
+            eligible = [tx_ref for tx_ref, delivery_status in current.items() if delivery_status == previous]
+            updated = self.filter(tx_ref__in=eligible, delivery_status=previous).update(**changes)
+            if updated != len(eligible):
+                #  Если база данных не блокирует строки (SQLite), статус мог измениться после чтения:
+                #  перечитываем статусы заказов, которые должны были быть изменены.
+                current.update(self.filter(tx_ref__in=eligible).values_list('tx_ref', 'delivery_status'))
+                eligible = [tx_ref for tx_ref in eligible if current[tx_ref] == status]
+        results = {}
+        for tx_ref in tx_refs:
+            if tx_ref not in current:
+                results[tx_ref] = ('NOT_FOUND', None)
+            elif tx_ref in eligible:
+                results[tx_ref] = ('UPDATED', status)
+            else:
+                results[tx_ref] = ('INVALID_TRANSITION', current[tx_ref])
+        return results
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-19 05:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicate_cart_items(apps, schema_editor):
+    #  До появления ограничения параллельные запросы могли создать несколько строк корзины
+    #  на один и тот же товар. Оставляем самую свежую из них.
+    OrderItem = apps.get_model('profiles', 'OrderItem')
+    seen = set()
+    duplicates = []
+    cart_items = OrderItem.objects.filter(order__isnull=True).order_by('-updated_at')
+    for item_id, user_id, product_id in cart_items.values_list('id', 'user_id', 'product_id').iterator():
+        key = (user_id, product_id)
+        if key in seen:
+            duplicates.append(item_id)
+        else:
+            seen.add(key)
+    OrderItem.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0001_initial'),
+        ('shop', '0002_product_category_alter_product_price_current'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('order__isnull', True)), fields=('user', 'product'), name='unique_open_cart_item'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.4 on 2026-10-19 05:54
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def snapshot_existing_orders(apps, schema_editor):
+    #  Для уже оформленных заказов исторические цены неизвестны, поэтому фиксируется текущая цена товара.
+    OrderItem = apps.get_model('profiles', 'OrderItem')
+    Order = apps.get_model('profiles', 'Order')
+    Product = apps.get_model('shop', 'Product')
+    price = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price_current')[:1])
+    OrderItem.objects.filter(order__isnull=False, unit_price__isnull=True).update(unit_price=price)
+    OrderItem.objects.filter(order__isnull=False, line_total__isnull=True).update(
+        line_total=ExpressionWrapper(F('quantity') * F('unit_price'), output_field=DecimalField()))
+    subtotal = Subquery(
+        OrderItem.objects.filter(order_id=OuterRef('pk')).values('order_id')
+        .annotate(subtotal=Sum('line_total')).values('subtotal')[:1]
+    )
+    Order.objects.update(subtotal=Coalesce(subtotal, 0, output_field=DecimalField()))
+    Order.objects.update(total=F('subtotal'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_unique_open_cart_item'),
+        ('shop', '0002_product_category_alter_product_price_current'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='country',
+            field=models.CharField(max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='line_total',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(snapshot_existing_orders, migrations.RunPython.noop),
+    ]
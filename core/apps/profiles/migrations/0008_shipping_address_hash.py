@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:15
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+
+#  Копия apps.profiles.managers на момент миграции: изменение нормализации в коде не должно менять то,
+#  что эта миграция вычисляет и удаляет.
+ADDRESS_HASH_FIELDS = ('full_name', 'email', 'phone', 'address', 'city', 'country', 'zipcode')
+
+
+def make_address_hash(data):
+    values = []
+    for field in ADDRESS_HASH_FIELDS:
+        value = data.get(field)
+        values.append('' if value is None else ' '.join(str(value).split()).casefold())
+    return hashlib.sha256('\x1f'.join(values).encode()).hexdigest()
+
+
+def backfill_address_hashes(apps, schema_editor):
+    #  Заполняет address_hash для существующих адресов. Если у пользователя несколько одинаковых адресов,
+    #  остается самый ранний из них: заказы хранят копию адреса, поэтому удаление дубликатов их не затрагивает.
+    ShippingAddress = apps.get_model('profiles', 'ShippingAddress')
+    seen = set()
+    duplicates = []
+    changed = []
+    rows = ShippingAddress.objects.order_by('created_at').values('id', 'user_id', *ADDRESS_HASH_FIELDS)
+    for row in rows.iterator():
+        address_hash = make_address_hash(row)
+        key = (row['user_id'], address_hash)
+        if key in seen:
+            duplicates.append(row['id'])
+        else:
+            seen.add(key)
+            changed.append(ShippingAddress(id=row['id'], address_hash=address_hash))
+    ShippingAddress.objects.filter(id__in=duplicates).delete()
+    ShippingAddress.objects.bulk_update(changed, ['address_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0007_archived_orders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shippingaddress',
+            name='address_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_address_hashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='shippingaddress',
+            constraint=models.UniqueConstraint(fields=('user', 'address_hash'), name='unique_shipping_address'),
+        ),
+    ]
@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
 from apps.accounts.models import User
+from apps.common.managers import GetOrNoneManager
 from apps.common.models import BaseModel
-from apps.common.utils import generate_unique_code
+from apps.common.utils import generate_tx_ref
+from apps.profiles.managers import OrderItemManager, OrderManager, ShippingAddressManager, make_address_hash
 from apps.shop.models import Product
 
 DELIVERY_STATUS_CHOICES = (
@@ -13,6 +15,14 @@ DELIVERY_STATUS_CHOICES = (
     ("SUCCESS", "SUCCESS"),
 )
 
+#  Допустимые переходы статуса доставки: новый статус -> статус, из которого в него можно перейти.
+DELIVERY_STATUS_TRANSITIONS = {
+    "PACKING": "PENDING",
+    "SHIPPING": "PACKING",
+    "ARRIVING": "SHIPPING",
+    "SUCCESS": "ARRIVING",
+}
+
 PAYMENT_STATUS_CHOICES = (
     ("PENDING", "PENDING"),
     ("PROCESSING", "PROCESSING"),
@@ -35,10 +45,13 @@ class ShippingAddress(BaseModel):
         город (str): Город получателя.
         страна (str): Страна получателя.
         zipcode (int): Почтовый индекс получателя.
+        address_hash (str): Хеш нормализованного адреса, уникальный в пределах пользователя.
 
     Методы:
         __str__():
             Возвращает строковое представление данных о доставке.
+        save(*args, **kwargs):
+            Переопределяет метод save для пересчета address_hash.
     """
 
     user = models.ForeignKey(
@@ -51,10 +64,26 @@ class ShippingAddress(BaseModel):
     city = models.CharField(max_length=200, null=True)
     country = models.CharField(max_length=200, null=True)
     zipcode = models.IntegerField(null=True)
+    address_hash = models.CharField(max_length=64, editable=False)
+
+    objects = ShippingAddressManager()
+
+    class Meta:
+        constraints = [
+            #  Одинаковый адрес сохраняется у пользователя один раз.
+            models.UniqueConstraint(fields=['user', 'address_hash'], name='unique_shipping_address'),
+        ]
 
     def __str__(self):
         return f"{self.full_name}'s shipping details"
 
+    def save(self, *args, **kwargs) -> None:
+        self.address_hash = make_address_hash(self.__dict__)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'address_hash' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'address_hash']
+        super().save(*args, **kwargs)
+
 
 class Order(BaseModel):
     """
@@ -65,12 +94,17 @@ class Order(BaseModel):
         tx_ref (str): Уникальная ссылка на транзакцию.
         delivery_status (str): Статус доставки заказа.
         payment_status (str): Статус оплаты заказа.
+        subtotal (Decimal): Стоимость товаров заказа, зафиксированная при оформлении.
+        total (Decimal): Итоговая стоимость заказа, зафиксированная при оформлении.
+        sales_recorded (bool): Заказ учтен в аналитике продавцов.
 
     Методы:
         __str__():
             Возвращает строковое представление ссылки на транзакцию.
         save(*args, **kwargs):
             Переопределяет метод save для генерации уникальной ссылки на транзакцию при создании нового заказа.
+            Ссылка уникальна по построению и не требует проверочного запроса к базе данных; если вставка
+            все же нарушает уникальность tx_ref, она повторяется один раз с новой ссылкой.
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
@@ -89,26 +123,58 @@ class Order(BaseModel):
     phone = models.CharField(max_length=20, null=True)
     address = models.CharField(max_length=1000, null=True)
     city = models.CharField(max_length=100, null=True)
+    country = models.CharField(max_length=200, null=True)
     zipcode = models.IntegerField(null=True)
 
+    #  Стоимость заказа фиксируется при оформлении и не меняется при изменении цен продавцом
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    #  Заказ учтен в дневной аналитике продавцов (ProductSalesRollup, CustomerSalesRollup).
+    #  Флаг не дает учесть заказ дважды при повторном выполнении фоновой задачи.
+    sales_recorded = models.BooleanField(default=False)
+
+    objects = OrderManager()
+
+    class Meta:
+        indexes = [
+            #  История заказов пользователя выбирается курсором по created_at.
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            #  Поиск заказов поддержкой (StaffOrderSearchView): фильтр по одному столбцу и курсор по created_at.
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+            models.Index(fields=['email', '-created_at'], name='order_email_created_idx'),
+            models.Index(fields=['phone', '-created_at'], name='order_phone_created_idx'),
+            models.Index(fields=['payment_status', '-created_at'], name='order_payment_created_idx'),
+            models.Index(fields=['delivery_status', '-created_at'], name='order_delivery_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.full_name}'s order"
 
     def save(self, *args, **kwargs) -> None:
-        if self._state.adding:
-            self.tx_ref = generate_unique_code(Order, "tx_ref")
-        super().save(*args, **kwargs)
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        self.tx_ref = generate_tx_ref()
+        try:
+            #  Точка сохранения позволяет повторить вставку, не прерывая внешнюю транзакцию оформления заказа.
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError:
+            #  Совпадение tx_ref возможно только при совпадении идентификаторов узлов разных процессов,
+            #  поэтому достаточно одной повторной попытки с новой ссылкой.
+            if not Order.objects.filter(tx_ref=self.tx_ref).exists():
+                raise
+            self.tx_ref = generate_tx_ref()
+            super().save(*args, **kwargs)
 
     @property
     def get_cart_subtotal(self):
-        orderitems = self.orderitems.all()
-        total = sum([item.get_total for item in orderitems])
-        return total
+        return self.subtotal
 
     @property
     def get_cart_total(self):
-        total = self.get_cart_subtotal
-        return total
+        return self.total
 
 
 class OrderItem(BaseModel):
@@ -119,6 +185,8 @@ class OrderItem(BaseModel):
         order (ForeignKey): Заказ, к которому относится данный товар.
         product (ForeignKey): Товар, связанный с этой позицией заказа.
         quantity (int): Количество заказанного продукта.
+        unit_price (Decimal): Цена за единицу товара на момент оформления заказа (пусто, пока товар в корзине).
+        line_total (Decimal): Стоимость позиции на момент оформления заказа (пусто, пока товар в корзине).
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -131,13 +199,124 @@ class OrderItem(BaseModel):
     )
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    objects = OrderItemManager()
 
     @property
     def get_total(self):
+        #  Для оформленного заказа используется зафиксированная стоимость, для корзины - текущая цена товара.
+        if self.line_total is not None:
+            return self.line_total
         return self.product.price_current * self.quantity
 
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            #  В корзине (order IS NULL) у пользователя может быть только одна строка на товар.
+            #  Этот индекс также служит целью конфликта для INSERT ... ON CONFLICT в upsert_cart_item.
+            models.UniqueConstraint(
+                fields=['user', 'product'],
+                condition=models.Q(order__isnull=True),
+                name='unique_open_cart_item',
+            ),
+        ]
+        indexes = [
+            #  Лента заказов продавца соединяет позиции с заказами через товары продавца:
+            #  по этому индексу order_id читается без обращения к таблице.
+            models.Index(fields=['product', 'order'], name='orderitem_product_order_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.product.name)
+
+
+class ArchivedOrder(models.Model):
+    """
+    Доставленный заказ, перенесенный командой archive_orders из таблицы Order.
+
+    Поля совпадают с полями Order (включая id и created_at исходного заказа), поэтому архивный заказ
+    сериализуется теми же сериализаторами. Отдельная таблица не дает завершенным заказам
+    увеличивать таблицы и индексы, с которыми работают корзина и оформление заказов.
+
+    Атрибуты:
+        archived_at (datetime): Время переноса заказа в архив.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    tx_ref = models.CharField(max_length=100, unique=True)
+    delivery_status = models.CharField(max_length=20, choices=DELIVERY_STATUS_CHOICES)
+    payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES)
+    date_delivered = models.DateTimeField(null=True, blank=True)
+
+    full_name = models.CharField(max_length=1000, null=True)
+    email = models.EmailField(null=True)
+    phone = models.CharField(max_length=20, null=True)
+    address = models.CharField(max_length=1000, null=True)
+    city = models.CharField(max_length=100, null=True)
+    country = models.CharField(max_length=200, null=True)
+    zipcode = models.IntegerField(null=True)
+
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    sales_recorded = models.BooleanField(default=False)
+
+    objects = GetOrNoneManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_order_user_idx'),
+            models.Index(fields=['-created_at'], name='archived_order_created_idx'),
+            models.Index(fields=['email', '-created_at'], name='archived_order_email_idx'),
+            models.Index(fields=['phone', '-created_at'], name='archived_order_phone_idx'),
+            models.Index(fields=['payment_status', '-created_at'], name='archived_order_payment_idx'),
+            models.Index(fields=['delivery_status', '-created_at'], name='archived_order_delivery_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.full_name}'s archived order"
+
+    @property
+    def get_cart_subtotal(self):
+        return self.subtotal
+
+    @property
+    def get_cart_total(self):
+        return self.total
+
+
+class ArchivedOrderItem(models.Model):
+    """
+    Позиция архивного заказа. Поля совпадают с полями OrderItem оформленного заказа.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    order = models.ForeignKey(ArchivedOrder, related_name='orderitems', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_orderitems')
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    objects = GetOrNoneManager()
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    @property
+    def get_total(self):
+        if self.line_total is not None:
+            return self.line_total
+        return self.unit_price * self.quantity
 
     def __str__(self):
         return str(self.product.name)
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from apps.profiles.models import DELIVERY_STATUS_CHOICES, PAYMENT_STATUS_CHOICES
+
 
 class ProfileSerializer(serializers.Serializer):
     first_name = serializers.CharField(max_length=25)
@@ -19,3 +21,19 @@ class ShippingAddressSerializer(serializers.Serializer):
     country = serializers.CharField()
     zipcode = serializers.IntegerField()
 
+
+#  Параметры поиска заказов поддержкой. Каждый фильтр - точное совпадение, чтобы поиск шел по индексу
+#  (столбец, created_at); даты задают диапазон created_at включительно.
+class OrderSearchQuerySerializer(serializers.Serializer):
+    tx_ref = serializers.CharField(max_length=100, required=False)
+    email = serializers.EmailField(required=False)
+    phone = serializers.CharField(max_length=20, required=False)
+    payment_status = serializers.ChoiceField(choices=PAYMENT_STATUS_CHOICES, required=False)
+    delivery_status = serializers.ChoiceField(choices=DELIVERY_STATUS_CHOICES, required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': 'Start date must not be after end date'})
+        return attrs
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.mail import send_mail, send_mass_mail
+
+from apps.jobs.registry import job
+from apps.profiles.models import Order, OrderItem
+
+
+#  Фоновые задачи, которые выполняются после оформления заказа обработчиком run_jobs,
+#  чтобы не увеличивать время ответа CheckoutView.
+
+@job('profiles.send_order_confirmation')
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related('user').get(id=order_id)
+    send_mail(
+        subject=f'Заказ {order.tx_ref} оформлен',
+        message=f'Ваш заказ {order.tx_ref} на сумму {order.total} оформлен и ожидает оплаты.',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[order.email or order.user.email],
+    )
+
+
+@job('profiles.notify_sellers')
+def notify_sellers(order_id):
+    orderitems = OrderItem.objects.filter(order_id=order_id).select_related(
+        'order', 'product', 'product__seller', 'product__seller__user')
+    lines_by_seller = {}
+    for item in orderitems:
+        if item.product.seller:
+            lines_by_seller.setdefault(item.product.seller, []).append(item)
+    messages = [
+        (
+            f'Новый заказ {items[0].order.tx_ref}',
+            '\n'.join(f'{item.product.name} x {item.quantity}' for item in items),
+            settings.DEFAULT_FROM_EMAIL,
+            [seller.user.email],
+        )
+        for seller, items in lines_by_seller.items()
+    ]
+    send_mass_mail(messages)
@@ -1,3 +1,139 @@
+import datetime
+from unittest import mock
+
+from django.db import IntegrityError
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.common.testing import QueryBudgetMixin, create_order, create_product, create_seller, create_user, jwt_client
+from apps.profiles.archive import archive_batch
+from apps.profiles.models import ArchivedOrder, Order, OrderItem, ShippingAddress
+
+
+class OrdersQueryBudgetTest(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.product = create_product(create_seller())
+
+    def setUp(self):
+        self.client = jwt_client(self.user)
+
+    def test_orders(self):
+        #  Пользователь, страница заказов и страница архива.
+        self.assertQueryBudget(3, lambda count: [create_order(self.user, [self.product]) for _ in range(count)],
+                               lambda: self.client.get('/profiles/orders/?page_size=100'))
+
+    def test_order_items(self):
+        order = create_order(self.user, [])
+
+        def create_items(count):
+            OrderItem.objects.bulk_create([
+                OrderItem(user=self.user, order=order, product=create_product(), quantity=1, unit_price=1,
+                          line_total=1)
+                for _ in range(count)
+            ])
+
+        #  Пользователь, заказ и его позиции вместе с товарами и категориями.
+        self.assertQueryBudget(3, create_items, lambda: self.client.get(f'/profiles/orders/{order.tx_ref}/'))
+
+    def test_shipping_addresses(self):
+        def create_addresses(count):
+            for _ in range(count):
+                ShippingAddress.objects.create(user=self.user, full_name='Buyer', email=self.user.email,
+                                               address=f'Street {ShippingAddress.objects.count()}')
+
+        #  Пользователь и адреса.
+        self.assertQueryBudget(2, create_addresses, lambda: self.client.get('/profiles/shipping_addresses/'))
+
+    def test_staff_order_search(self):
+        client = jwt_client(create_user(is_staff=True))
+        #  Пользователь, страница заказов и страница архива вместе с покупателями.
+        self.assertQueryBudget(3, lambda count: [create_order(self.user, [self.product]) for _ in range(count)],
+                               lambda: client.get(f'/profiles/orders/search/?email={self.user.email}&page_size=100'))
+
+
+class OrderTxRefTest(TestCase):
+
+    def test_duplicate_tx_ref_is_regenerated_once(self):
+        user = create_user()
+        existing = Order.objects.create(user=user)
+        with mock.patch('apps.profiles.models.generate_tx_ref', side_effect=[existing.tx_ref, 'FRESHTXREF']):
+            order = Order.objects.create(user=user)
+        self.assertEqual(order.tx_ref, 'FRESHTXREF')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        with self.assertRaises(IntegrityError):
+            Order.objects.create(user_id=None)
+
+
+class ShippingAddressUpdateTest(TestCase):
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = jwt_client(self.user)
+        self.data = {'full_name': 'Buyer', 'email': 'buyer@example.com', 'phone': '+70000000000',
+                     'address': 'Street 1', 'city': 'Moscow', 'country': 'Russia', 'zipcode': 101000}
+        self.first = ShippingAddress.objects.create(user=self.user, **self.data)
+        self.second = ShippingAddress.objects.create(user=self.user, **{**self.data, 'address': 'Street 2'})
+
+    def test_update(self):
+        response = self.client.put(f'/profiles/shipping_addresses/detail/{self.second.id}/',
+                                   {**self.data, 'address': 'Street 3'})
+        self.assertEqual(response.status_code, 200)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.address, 'Street 3')
+
+    def test_update_to_existing_address_conflicts(self):
+        #  Отличие только в регистре и пробелах дает тот же адрес.
+        response = self.client.put(f'/profiles/shipping_addresses/detail/{self.second.id}/',
+                                   {**self.data, 'city': ' MOSCOW '})
+        self.assertEqual(response.status_code, 409)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.address, 'Street 2')
+
+
+class ArchivedOrdersTest(TestCase):
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = jwt_client(self.user)
+        self.product = create_product(create_seller())
+        now = timezone.now()
+        #  Заказы от новых к старым; архивируются второй и четвертый, чтобы страницы смешивали обе таблицы.
+        self.orders = []
+        for days, delivered in ((1, False), (2, True), (3, False), (4, True), (5, False)):
+            order = create_order(self.user, [self.product])
+            changes = {'created_at': now - datetime.timedelta(days=days)}
+            if delivered:
+                changes.update(delivery_status='SUCCESS', date_delivered=now - datetime.timedelta(days=400))
+            Order.objects.filter(pk=order.pk).update(**changes)
+            self.orders.append(order)
+        #  Перенос в два пакета по одному заказу.
+        archive_batch(now - datetime.timedelta(days=365), batch_size=1)
+        archive_batch(now - datetime.timedelta(days=365), batch_size=1)
+
+    def test_archived_orders_moved(self):
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_feed_lists_each_order_once(self):
+        tx_refs = []
+        url = '/profiles/orders/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            tx_refs += [order['tx_ref'] for order in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(tx_refs, [order.tx_ref for order in self.orders])
+
+    def test_archived_order_detail(self):
+        archived = self.orders[1]
+        response = self.client.get(f'/profiles/orders/{archived.tx_ref}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
 
-# Create your tests here.
+        other = jwt_client(create_user())
+        self.assertEqual(other.get(f'/profiles/orders/{archived.tx_ref}/').status_code, 404)
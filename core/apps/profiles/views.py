@@ -1,13 +1,19 @@
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.common.paginations import CreatedAtCursorPagination, MergedQuerySet
 from apps.common.permissions import IsOwner
 from apps.common.utils import set_dict_attr
-from apps.profiles.models import ShippingAddress, Order, OrderItem
+from apps.profiles.models import ShippingAddress, Order, ArchivedOrder
 
-from apps.profiles.serializers import ProfileSerializer, ShippingAddressSerializer
-from apps.shop.serializers import OrderSerializer, CheckItemOrderSerializer
+from apps.profiles.serializers import ProfileSerializer, ShippingAddressSerializer, OrderSearchQuerySerializer
+from apps.shop.serializers import OrderSerializer, CheckItemOrderSerializer, StaffOrderSerializer
 
 tags = ['Profiles']
 
@@ -54,8 +60,8 @@ class ProfileView(APIView):
     )
     def delete(self, request):
         user = request.user
-        user.is_active = False
-        user.save()
+        #  Деактивация также отзывает выданные токены и сбрасывает пользователя в кеше аутентификации.
+        user.deactivate()
         return Response(data={'message': 'Учетная запись пользователя деактивирована'})
 
 
@@ -88,10 +94,11 @@ class ShippingAddressView(APIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
-        shipping_address, _ = ShippingAddress.objects.get_or_create(user=user, **data)  # _ используется
+        shipping_address, _ = ShippingAddress.objects.get_or_create_for_user(user, data)  # _ используется
         # для игнорирования возвращаемого значения bool, указывающего, был ли создан новый объект или нет
         # Нам это не нужно. Мы используем эту логику, в случае если пользователь не изменяет свой адрес доставки
         # но отправляет POST запрос, мы его получали из БД, а не записывали еще раз в БД.
+        # Адрес ищется по хешу его содержимого (уникальный индекс user, address_hash).
         serializer = self.serializer_class(shipping_address)
         return Response(data=serializer.data, status=201)
 
@@ -142,8 +149,15 @@ class ShippingAddressViewID(APIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
-        shipping_address = set_dict_attr(shipping_address)
-        shipping_address.save()
+        shipping_address = set_dict_attr(shipping_address, data)
+        #  Если у пользователя уже есть адрес с таким содержимым, второй такой же не сохраняется: это проверяет
+        #  уникальный индекс (user, address_hash), в том числе при параллельном изменении двух адресов.
+        #  Точка сохранения откатывает только неудачный UPDATE.
+        try:
+            with transaction.atomic():
+                shipping_address.save()
+        except IntegrityError:
+            return Response(data={'message': 'Такой адрес доставки уже существует!'}, status=409)
         serializer = self.serializer_class(shipping_address)
         return Response(data=serializer.data, status=200)
 
@@ -167,12 +181,14 @@ class ShippingAddressViewID(APIView):
 class OrdersView(APIView):
     permission_classes = [IsOwner]
     serializer_class = OrderSerializer
+    pagination_class = CreatedAtCursorPagination
 
     @extend_schema(
         operation_id='orders_view',
         summary='Orders Fetch',
         description="""
-            Эта конечная точка возвращает все заказы для конкретного пользователя.
+            Эта конечная точка возвращает заказы конкретного пользователя, от новых к старым,
+            с курсорной пагинацией (параметры cursor и page_size).
         """,
         tags=tags
     )
@@ -182,16 +198,62 @@ class OrdersView(APIView):
         #  Выполняет запрос к базе данных для получения заказов текущего пользователя.
         #  .select_related("user"): Загружает связанную модель пользователя (user) для каждого заказа
         #  чтобы избежать дополнительных запросов к базе данных.
-        #  .prefetch_related("orderitems", "orderitems__product"): Предварительно загружает связанные элементы заказа
-        #  (orderitems) и продукты внутри этих элементов (orderitems__product).
-        #  .order_by("-created_at"): Сортирует заказы по полю created_at в обратном порядке (от самых новых к старым).
-        orders = (Order.objects.filter(user=user).select_related('user')
-                  .prefetch_related('orderitems', 'orderitems__product')
-                  .order_by('-created_at'))
-        #  Создается сериализатор для сериализации списка заказов.
-        serializer = self.serializer_class(orders, many=True)
-        #  Возвращает HTTP-ответ с кодом 200 (OK) и сериализованными данными заказов.
-        return Response(data=serializer.data, status=200)
+        #  Позиции заказа не загружаются: subtotal и total хранятся в самом заказе.
+        #  Старые доставленные заказы перенесены в архивную таблицу, поэтому читаются обе таблицы.
+        orders = MergedQuerySet(
+            Order.objects.filter(user=user).select_related('user'),
+            ArchivedOrder.objects.filter(user=user).select_related('user'),
+        )
+        #  Курсорная пагинация сортирует заказы по created_at (от самых новых к старым)
+        #  и выбирает одну страницу из каждой таблицы по индексу (user, created_at).
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        #  Создается сериализатор для сериализации страницы заказов.
+        serializer = self.serializer_class(page, many=True)
+        #  Возвращает HTTP-ответ со ссылками next/previous и сериализованными данными заказов.
+        return paginator.get_paginated_response(serializer.data)
+
+
+#  Поиск заказов для поддержки: по tx_ref, email или телефону покупателя, статусам и диапазону дат.
+#  Каждый фильтр - точное совпадение по столбцу с составным индексом (столбец, created_at), а страница выбирается
+#  курсором по created_at, поэтому время ответа не зависит от размера таблицы и номера страницы.
+class StaffOrderSearchView(APIView):
+    permission_classes = [IsAdminUser]
+    serializer_class = StaffOrderSerializer
+    pagination_class = CreatedAtCursorPagination
+
+    @extend_schema(
+        summary='Staff Orders Search',
+        description="""
+            Эта конечная точка ищет заказы всех пользователей (основные и архивные) для поддержки.
+            Фильтры: tx_ref, email, phone, payment_status, delivery_status, start и end (даты оформления).
+            Результаты возвращаются от новых к старым с курсорной пагинацией (параметры cursor и page_size).
+            Доступна только администраторам.
+        """,
+        tags=tags,
+        parameters=[OrderSearchQuerySerializer],
+    )
+    def get(self, request, *args, **kwargs):
+        query = OrderSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        filters = {field: params[field] for field in ('tx_ref', 'email', 'phone', 'payment_status', 'delivery_status')
+                   if field in params}
+        #  Даты переводятся в границы created_at, а не сравниваются через created_at__date:
+        #  функция от столбца не позволила бы использовать индекс.
+        if 'start' in params:
+            filters['created_at__gte'] = timezone.make_aware(datetime.combine(params['start'], time.min))
+        if 'end' in params:
+            next_day = params['end'] + timedelta(days=1)
+            filters['created_at__lt'] = timezone.make_aware(datetime.combine(next_day, time.min))
+        orders = MergedQuerySet(
+            Order.objects.filter(**filters).select_related('user'),
+            ArchivedOrder.objects.filter(**filters).select_related('user'),
+        )
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        serializer = self.serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 #  Это представление возвращает список элементов конкретного заказа (товаров внутри заказа).
@@ -210,11 +272,13 @@ class OrderItemView(APIView):
     def get(self, request, *args, **kwargs):
         #  Получаем заказ по tx_ref (идентификатор транзакции), передаваемому в параметрах URL.
         #  get_or_none возвращает None, если заказ не найден.
-        order = Order.objects.get_or_none(tx_ref=kwargs['tx_ref'])
-        if not order or order.user != request.user:
+        #  Если заказа нет в основной таблице, он ищется в архиве.
+        order = (Order.objects.get_or_none(tx_ref=kwargs['tx_ref'])
+                 or ArchivedOrder.objects.get_or_none(tx_ref=kwargs['tx_ref']))
+        if not order or order.user_id != request.user.id:
             return Response(data={'message': 'Order does not exist!'}, status=404)
-        #  Получаем товары заказа, принадлежащих к найденному заказу.
-        order_items = OrderItem.objects.filter(order=order)
+        #  Получаем товары заказа, принадлежащих к найденному заказу, вместе с товаром и его категорией.
+        order_items = order.orderitems.select_related('product', 'product__category')
         #  Сериализация элементов заказа.
         serializer = self.serializer_class(order_items, many=True)
         #  Возврат ответа.
@@ -0,0 +1,221 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.profiles.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from apps.sellers.models import CustomerSalesRollup, ProductSalesRollup
+
+
+def _increment(model, lookup, units, revenue):
+    #  Увеличивает счетчики строки агрегата на один заказ. Если строки еще нет, она создается;
+    #  при одновременном создании той же строки другим процессом повторяется UPDATE.
+    changes = {
+        'orders': F('orders') + 1,
+        'units': F('units') + units,
+        'revenue': F('revenue') + revenue,
+        'updated_at': timezone.now(),
+    }
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, orders=1, units=units, revenue=revenue)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record_order_sales(order_id):
+    """
+    Добавляет заказ в дневные агрегаты продаж его продавцов.
+
+    Заказ помечается флагом sales_recorded в той же транзакции, поэтому повторный вызов
+    (например, при повторе фоновой задачи) ничего не меняет.
+
+    Возвращает:
+        bool: True, если заказ был учтен этим вызовом.
+    """
+    with transaction.atomic():
+        if not Order.objects.filter(id=order_id, sales_recorded=False).update(sales_recorded=True):
+            return False
+        order = Order.objects.only('user_id', 'created_at').get(id=order_id)
+        day = timezone.localdate(order.created_at)
+        lines = (
+            OrderItem.objects.filter(order_id=order_id, product__seller__isnull=False)
+            .values_list('product__seller_id', 'product_id')
+            .annotate(units=Sum('quantity'), revenue=Sum('line_total'))
+            .order_by()
+        )
+        by_seller = {}
+        for seller_id, product_id, units, revenue in lines:
+            _increment(ProductSalesRollup, {'seller_id': seller_id, 'product_id': product_id, 'day': day},
+                       units, revenue)
+            seller_units, seller_revenue = by_seller.get(seller_id, (0, 0))
+            by_seller[seller_id] = (seller_units + units, seller_revenue + revenue)
+        for seller_id, (units, revenue) in by_seller.items():
+            _increment(CustomerSalesRollup, {'seller_id': seller_id, 'customer_id': order.user_id, 'day': day},
+                       units, revenue)
+    return True
+
+
+def _day_start(day):
+    #  Начало дня в текущем часовом поясе.
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _sales_rows(order_model, line_model, start, end):
+    """
+    Строки продаж по товарам и покупателям за период из одной пары таблиц заказов и позиций.
+
+    Возвращает:
+        tuple: (queryset заказов периода, строки по товарам, строки по покупателям).
+    """
+    #  Период полуоткрытый: [начало дня start, начало дня после end), чтобы использовался индекс по created_at.
+    orders = order_model.objects.filter(created_at__gte=_day_start(start),
+                                        created_at__lt=_day_start(end + timedelta(days=1)))
+    lines = (
+        line_model.objects.filter(order__in=orders, product__seller__isnull=False)
+        .annotate(day=TruncDate('order__created_at'))
+    )
+    totals = {'order_count': Count('order_id', distinct=True), 'units': Sum('quantity'), 'revenue': Sum('line_total')}
+    product_rows = lines.values_list('product__seller_id', 'product_id', 'day').annotate(**totals).order_by()
+    customer_rows = lines.values_list('product__seller_id', 'order__user_id', 'day').annotate(**totals).order_by()
+    return orders, product_rows, customer_rows
+
+
+def _merge_rows(*row_sets):
+    #  Заказ находится только в одной из таблиц, поэтому количества заказов из разных таблиц складываются.
+    merged = {}
+    for rows in row_sets:
+        for *key, order_count, units, revenue in rows:
+            total = merged.setdefault(tuple(key), [0, 0, Decimal('0.00')])
+            total[0] += order_count
+            total[1] += units
+            total[2] += revenue
+    return [(*key, *total) for key, total in merged.items()]
+
+
+def rebuild_sales_rollups(start, end, batch_size=1000):
+    """
+    Пересчитывает агрегаты продаж за дни с start по end включительно по основной и архивной таблицам
+    заказов и помечает заказы этих дней учтенными.
+
+    Возвращает:
+        tuple: Количество созданных строк ProductSalesRollup и CustomerSalesRollup.
+    """
+    with transaction.atomic():
+        orders, hot_products, hot_customers = _sales_rows(Order, OrderItem, start, end)
+        archived, cold_products, cold_customers = _sales_rows(ArchivedOrder, ArchivedOrderItem, start, end)
+        product_rows = _merge_rows(hot_products, cold_products)
+        customer_rows = _merge_rows(hot_customers, cold_customers)
+        ProductSalesRollup.objects.filter(day__range=(start, end)).delete()
+        CustomerSalesRollup.objects.filter(day__range=(start, end)).delete()
+        products = ProductSalesRollup.objects.bulk_create([
+            ProductSalesRollup(seller_id=seller_id, product_id=product_id, day=day, orders=order_count,
+                               units=units, revenue=revenue)
+            for seller_id, product_id, day, order_count, units, revenue in product_rows
+        ], batch_size=batch_size)
+        customers = CustomerSalesRollup.objects.bulk_create([
+            CustomerSalesRollup(seller_id=seller_id, customer_id=customer_id, day=day, orders=order_count,
+                                units=units, revenue=revenue)
+            for seller_id, customer_id, day, order_count, units, revenue in customer_rows
+        ], batch_size=batch_size)
+        orders.filter(sales_recorded=False).update(sales_recorded=True)
+        archived.filter(sales_recorded=False).update(sales_recorded=True)
+    return len(products), len(customers)
+
+
+def _period_start(days, period):
+    #  Начало периода для каждого дня: понедельник недели (1970-01-01 - четверг) или первое число месяца.
+    if period == 'week':
+        return days - (days.astype('int64') + 3) % 7
+    if period == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+
+def resample(rows, start, end, period):
+    """
+    Сводит дневные строки к дням, неделям или месяцам диапазона. Периоды без продаж
+    возвращаются с нулевыми значениями.
+
+    Args:
+        rows (list): Кортежи (день, заказы, единицы, выручка), по одному на день.
+        start (date): Первый день диапазона.
+        end (date): Последний день диапазона.
+        period (str): 'day', 'week' или 'month'.
+    """
+    first, last = _period_start(np.array([start, end], dtype='datetime64[D]'), period)
+    if period == 'month':
+        buckets = np.arange(first.astype('datetime64[M]'), last.astype('datetime64[M]') + 1).astype('datetime64[D]')
+    else:
+        buckets = np.arange(first, last + 1, 7 if period == 'week' else 1, dtype='datetime64[D]')
+    if rows:
+        days, orders, units, revenue = zip(*rows)
+        index = np.searchsorted(buckets, _period_start(np.array(days, dtype='datetime64[D]'), period))
+        #  Выручка суммируется в копейках, чтобы не терять точность на числах с плавающей точкой.
+        cents = np.array([int(value * 100) for value in revenue], dtype='int64')
+        totals = [np.bincount(index, weights=values, minlength=len(buckets)).round().astype('int64')
+                  for values in (np.array(orders), np.array(units), cents)]
+    else:
+        totals = [np.zeros(len(buckets), dtype='int64')] * 3
+    return [
+        {'period': bucket.item(), 'orders': int(orders), 'units': int(units),
+         'revenue': Decimal(int(cents)) / 100}
+        for bucket, orders, units, cents in zip(buckets, *totals)
+    ]
+
+
+def sales_report(seller, start, end, period='day', limit=10):
+    """
+    Отчет о продажах продавца за диапазон дней. Читает только строки агрегатов продавца
+    за этот диапазон (индексы (seller, day)), а не таблицы заказов.
+    """
+    customer_rows = CustomerSalesRollup.objects.filter(seller=seller, day__range=(start, end))
+    product_rows = ProductSalesRollup.objects.filter(seller=seller, day__range=(start, end))
+    totals = {
+        'order_count': Sum('orders'),
+        'unit_count': Sum('units'),
+        'revenue_total': Sum('revenue'),
+    }
+    daily = customer_rows.values('day').annotate(**totals).order_by('day').values_list(
+        'day', 'order_count', 'unit_count', 'revenue_total')
+    products = (
+        product_rows.values('product__slug', 'product__name').annotate(**totals)
+        .order_by('-revenue_total', 'product__name')[:limit]
+    )
+    customers = (
+        customer_rows.values('customer__email', 'customer__first_name', 'customer__last_name').annotate(**totals)
+        .order_by('-revenue_total', 'customer__email')[:limit]
+    )
+    series = resample(list(daily), start, end, period)
+    return {
+        'start': start,
+        'end': end,
+        'period': period,
+        'orders': sum(row['orders'] for row in series),
+        'units': sum(row['units'] for row in series),
+        'revenue': sum((row['revenue'] for row in series), Decimal('0.00')),
+        'series': series,
+        'top_products': [
+            {'slug': row['product__slug'], 'name': row['product__name'], 'orders': row['order_count'],
+             'units': row['unit_count'], 'revenue': row['revenue_total']}
+            for row in products
+        ],
+        'top_customers': [
+            {'email': row['customer__email'],
+             'full_name': f"{row['customer__first_name']} {row['customer__last_name']}",
+             'orders': row['order_count'], 'units': row['unit_count'], 'revenue': row['revenue_total']}
+            for row in customers
+        ],
+    }
+
+
+def default_range(days=30):
+    #  Диапазон по умолчанию: последние days дней, включая сегодняшний.
+    end = timezone.localdate()
+    return end - timedelta(days=days - 1), end
@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from apps.profiles.models import ArchivedOrder, Order
+from apps.sellers.analytics import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает дневную аналитику продаж продавцов по основной и архивной таблицам заказов. '
+        'Без параметров пересчитывает все дни, за которые есть заказы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='Первый день (YYYY-MM-DD).')
+        parser.add_argument('--end', type=date.fromisoformat, help='Последний день (YYYY-MM-DD).')
+        parser.add_argument('--days-per-batch', type=int, default=31,
+                            help='Сколько дней пересчитывается в одной транзакции.')
+
+    def handle(self, *args, **options):
+        #  Границы по умолчанию берутся из обеих таблиц: доставленные заказы перенесены в архив.
+        bounds = [
+            model.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+            for model in (Order, ArchivedOrder)
+        ]
+        firsts = [bound['first'] for bound in bounds if bound['first'] is not None]
+        lasts = [bound['last'] for bound in bounds if bound['last'] is not None]
+        if not firsts and not (options['start'] and options['end']):
+            self.stdout.write('No orders to backfill')
+            return
+        start = options['start'] or timezone.localdate(min(firsts))
+        end = options['end'] or timezone.localdate(max(lasts))
+        if start > end:
+            raise CommandError('--start must not be after --end')
+        products = customers = 0
+        batch_start = start
+        while batch_start <= end:
+            batch_end = min(batch_start + timedelta(days=options['days_per_batch'] - 1), end)
+            created = rebuild_sales_rollups(batch_start, batch_end)
+            products += created[0]
+            customers += created[1]
+            self.stdout.write(f'{batch_start} - {batch_end}: {created[0]} product rows, {created[1]} customer rows')
+            batch_start = batch_end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {products} product and {customers} customer rollup rows from {start} to {end}'))
@@ -35,6 +35,61 @@ class Seller(BaseModel):
         return f"Seller for {self.business_name}"
 
 
+class ProductSalesRollup(BaseModel):
+    """
+    Продажи товара продавца за день. Обновляется фоновой задачей после оформления заказа
+    и командой backfill_sales_rollups; аналитика продавца читает только эти строки.
 
+    Атрибуты:
+        seller (ForeignKey): Продавец.
+        product (ForeignKey): Товар продавца.
+        day (date): День оформления заказов (в часовом поясе TIME_ZONE).
+        orders (int): Количество заказов с этим товаром.
+        units (int): Количество проданных единиц.
+        revenue (Decimal): Выручка по зафиксированным стоимостям позиций.
+    """
 
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='product_sales')
+    product = models.ForeignKey('shop.Product', on_delete=models.CASCADE, related_name='sales_rollups')
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'product', 'day'], name='unique_product_sales_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'day'], name='product_sales_seller_day_idx'),
+        ]
+
+
+class CustomerSalesRollup(BaseModel):
+    """
+    Покупки одного покупателя у продавца за день. Используется для рейтинга покупателей
+    и для количества заказов по дням: заказ принадлежит одному покупателю, поэтому учитывается один раз.
+
+    Атрибуты:
+        seller (ForeignKey): Продавец.
+        customer (ForeignKey): Покупатель.
+        day (date): День оформления заказов (в часовом поясе TIME_ZONE).
+        orders (int): Количество заказов покупателя с товарами продавца.
+        units (int): Количество купленных единиц.
+        revenue (Decimal): Сумма покупок по зафиксированным стоимостям позиций.
+    """
+
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='customer_sales')
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='purchase_rollups')
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'customer', 'day'], name='unique_customer_sales_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'day'], name='customer_sales_seller_day_idx'),
+        ]
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 
+from apps.profiles.models import DELIVERY_STATUS_CHOICES, DELIVERY_STATUS_TRANSITIONS, PAYMENT_STATUS_CHOICES
+from apps.sellers.analytics import default_range
+
 
 class SellerSerializer(serializers.Serializer):
     business_name = serializers.CharField(max_length=255)
@@ -19,3 +22,89 @@ class SellerSerializer(serializers.Serializer):
     bank_routing_number = serializers.CharField(max_length=50)
 
     is_approved = serializers.BooleanField(read_only=True)
+
+
+#  Параметры запроса аналитики продаж. Если диапазон не указан, используются последние 30 дней.
+class SalesAnalyticsQuerySerializer(serializers.Serializer):
+    PERIOD_CHOICES = (('day', 'day'), ('week', 'week'), ('month', 'month'))
+    #  Ограничение диапазона, чтобы один запрос не строил ряд за произвольно долгий период.
+    MAX_RANGE_DAYS = 3 * 366
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    period = serializers.ChoiceField(choices=PERIOD_CHOICES, default='day')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        #  Недостающая граница дополняется здесь, чтобы ограничения проверялись для итогового диапазона:
+        #  без end - до сегодняшнего дня, без start - за 30 дней, заканчивающихся end.
+        default_start, default_end = default_range()
+        end = attrs.setdefault('end', default_end)
+        start = attrs.setdefault('start', end - (default_end - default_start))
+        if start > end:
+            raise serializers.ValidationError({'start': 'Start date must not be after end date'})
+        if (end - start).days >= self.MAX_RANGE_DAYS:
+            raise serializers.ValidationError({'start': f'Range must not exceed {self.MAX_RANGE_DAYS} days'})
+        return attrs
+
+
+class SalesPeriodSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class TopProductSerializer(serializers.Serializer):
+    slug = serializers.SlugField()
+    name = serializers.CharField()
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class TopCustomerSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    full_name = serializers.CharField()
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+#  Отчет о продажах продавца: итоги диапазона, ряд по периодам и рейтинги товаров и покупателей.
+class SalesAnalyticsSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    period = serializers.CharField()
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    series = SalesPeriodSerializer(many=True)
+    top_products = TopProductSerializer(many=True)
+    top_customers = TopCustomerSerializer(many=True)
+
+
+#  Пакетное изменение статуса доставки: список tx_ref и новый статус.
+class DeliveryStatusBatchSerializer(serializers.Serializer):
+    tx_refs = serializers.ListField(child=serializers.CharField(max_length=100), allow_empty=False, max_length=1000)
+    status = serializers.ChoiceField(choices=list(DELIVERY_STATUS_TRANSITIONS))
+
+
+class DeliveryStatusResultSerializer(serializers.Serializer):
+    tx_ref = serializers.CharField()
+    #  UPDATED, NOT_FOUND или INVALID_TRANSITION
+    result = serializers.CharField()
+    delivery_status = serializers.CharField(allow_null=True)
+
+
+#  Параметры выгрузки позиций заказов в CSV. Все фильтры необязательны.
+class OrderExportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    delivery_status = serializers.ChoiceField(choices=DELIVERY_STATUS_CHOICES, required=False)
+    payment_status = serializers.ChoiceField(choices=PAYMENT_STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': 'Start date must not be after end date'})
+        return attrs
@@ -0,0 +1,8 @@
+from apps.jobs.registry import job
+from apps.sellers.analytics import record_order_sales
+
+
+#  Учет оформленного заказа в дневной аналитике продавцов.
+@job('sellers.record_order_sales')
+def record_sales(order_id):
+    record_order_sales(order_id)
@@ -1,3 +1,334 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+
+from apps.common.testing import (SHARED_CACHES, QueryBudgetMixin, create_category, create_order, create_product,
+                                 create_seller, create_user, jwt_client)
+from apps.profiles.archive import archive_batch
+from apps.profiles.models import ArchivedOrder, Order, OrderItem
+from apps.sellers.analytics import rebuild_sales_rollups, record_order_sales
+from apps.sellers.models import ProductSalesRollup
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class SellerRequestQueriesTest(TestCase):
+    """
+    Профиль продавца загружается вместе с пользователем при JWT-аутентификации и используется
+    IsSeller и представлениями продавца без дополнительных запросов. Пользователь кешируется
+    только в общем кеше, поэтому тесты используют файловый кеш.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller('seller@example.com')
+        cls.other = create_seller('other@example.com')
+        category = create_category()
+        cls.product = create_product(cls.seller, category)
+        cls.foreign_product = create_product(cls.other, category)
+
+    def setUp(self):
+        cache.clear()
+        self.client = jwt_client(self.seller.user)
+
+    def test_products_list(self):
+        #  Пользователь с профилем продавца и товары продавца.
+        with self.assertNumQueries(2):
+            response = self.client.get('/sellers/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['slug'] for product in response.data], [self.product.slug])
+
+    def test_cached_user_needs_no_seller_query(self):
+        self.client.get('/sellers/products/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/sellers/products/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_delete_checks_owner_without_loading_seller(self):
+        #  Пользователь, товар.
+        with self.assertNumQueries(2):
+            response = self.client.delete(f'/sellers/products/{self.foreign_product.slug}/')
+        self.assertEqual(response.status_code, 403)
+        #  Пользователь уже в кеше: товар и пометка товара удаленным.
+        with self.assertNumQueries(2):
+            response = self.client.delete(f'/sellers/products/{self.product.slug}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_orders(self):
+        #  Пользователь и страница заказов.
+        with self.assertNumQueries(2):
+            response = self.client.get('/sellers/orders/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unapproved_seller_is_denied(self):
+        seller = create_seller('pending@example.com', is_approved=False)
+        self.client = jwt_client(seller.user)
+        with self.assertNumQueries(1):
+            response = self.client.get('/sellers/orders/')
+        self.assertEqual(response.status_code, 403)
+
+
+class SellerQueryBudgetTest(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.buyer = create_user()
+
+    def setUp(self):
+        self.client = jwt_client(self.seller.user)
+
+    def create_orders(self, count):
+        for _ in range(count):
+            create_order(self.buyer, [create_product(self.seller)])
+
+    def test_products(self):
+        self.assertQueryBudget(2, lambda count: [create_product(self.seller) for _ in range(count)],
+                               lambda: self.client.get('/sellers/products/'))
+
+    def test_orders(self):
+        self.assertQueryBudget(2, self.create_orders, lambda: self.client.get('/sellers/orders/?page_size=100'))
+
+    def test_order_items(self):
+        order = create_order(self.buyer, [])
+
+        def create_items(count):
+            OrderItem.objects.bulk_create([
+                OrderItem(user=self.buyer, order=order, product=create_product(self.seller), quantity=1,
+                          unit_price=1, line_total=1)
+                for _ in range(count)
+            ])
+
+        #  Пользователь, заказ и позиции продавца вместе с товарами и категориями.
+        self.assertQueryBudget(3, create_items, lambda: self.client.get(f'/sellers/orders/{order.tx_ref}/'))
+
+    def test_analytics(self):
+        def create_sales(count):
+            for _ in range(count):
+                record_order_sales(create_order(create_user(), [create_product(self.seller)]).id)
+
+        #  Пользователь, ряд по дням, товары и покупатели.
+        self.assertQueryBudget(4, create_sales, lambda: self.client.get('/sellers/analytics/'))
+
+    def test_orders_export(self):
+        #  Пользователь, позиции архивных и текущих заказов.
+        self.assertQueryBudget(3, self.create_orders, lambda: self.client.get('/sellers/orders/export/'))
+
+
+class SellerAnalyticsRangeTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+
+    def setUp(self):
+        self.client = jwt_client(self.seller.user)
+
+    def test_default_range(self):
+        response = self.client.get('/sellers/analytics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['series']), 30)
+
+    def test_open_start_is_limited(self):
+        #  Без end диапазон заканчивается сегодня, поэтому далекий start превышает ограничение.
+        response = self.client.get('/sellers/analytics/?start=0001-01-01')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('start', response.data)
+
+    def test_open_end_is_limited(self):
+        #  Без start диапазон - 30 дней, заканчивающихся end, а не период от сегодняшнего дня до end.
+        response = self.client.get('/sellers/analytics/?end=9999-12-31')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['series']), 30)
+        response = self.client.get('/sellers/analytics/?start=2020-01-01&end=9999-12-31')
+        self.assertEqual(response.status_code, 400)
+
+    def test_start_after_end(self):
+        response = self.client.get('/sellers/analytics/?start=2024-02-01&end=2024-01-01')
+        self.assertEqual(response.status_code, 400)
+
+
+class StaffWithoutSellerProfileTest(TestCase):
+    """
+    Администратор проходит IsSeller, но без профиля продавца не должен получать позиции товаров,
+    продавец которых удален (Product.seller = NULL).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_user(is_staff=True)
+        cls.order = create_order(create_user(), [create_product()])
+
+    def setUp(self):
+        self.client = jwt_client(self.staff)
+
+    def test_orders_denied(self):
+        self.assertEqual(self.client.get('/sellers/orders/').status_code, 403)
+
+    def test_order_items_denied(self):
+        self.assertEqual(self.client.get(f'/sellers/orders/{self.order.tx_ref}/').status_code, 403)
+
+    def test_analytics_denied(self):
+        self.assertEqual(self.client.get('/sellers/analytics/').status_code, 403)
+
+
+class SellerOrdersExportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.product = create_product(cls.seller)
+        cls.buyer = create_user()
+
+    def setUp(self):
+        self.client = jwt_client(self.seller.user)
+
+    def create_order_at(self, created_at, **fields):
+        order = create_order(self.buyer, [self.product])
+        Order.objects.filter(pk=order.pk).update(created_at=created_at, **fields)
+        return order
+
+    def export(self, query=''):
+        response = self.client.get(f'/sellers/orders/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        return list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_period_includes_whole_end_day(self):
+        utc = datetime.timezone.utc
+        inside = [
+            self.create_order_at(datetime.datetime(2025, 3, 1, 0, 0, tzinfo=utc)),
+            self.create_order_at(datetime.datetime(2025, 3, 2, 23, 59, 59, 999999, tzinfo=utc)),
+        ]
+        self.create_order_at(datetime.datetime(2025, 2, 28, 23, 59, 59, tzinfo=utc))
+        self.create_order_at(datetime.datetime(2025, 3, 3, 0, 0, tzinfo=utc))
+
+        rows = self.export('?start=2025-03-01&end=2025-03-02')
+        self.assertEqual([row['tx_ref'] for row in rows], [order.tx_ref for order in inside])
+
+    def test_formula_cells_are_escaped(self):
+        self.create_order_at(datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc),
+                             full_name='=HYPERLINK("http://example.com")', city='-Moscow')
+        row, = self.export()
+        self.assertEqual(row['full_name'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row['city'], "'-Moscow")
+        self.assertEqual(row['quantity'], '1')
+
+
+class SellerOrdersStatusTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.buyer = create_user()
+        cls.product = create_product(cls.seller)
+        cls.foreign_order = create_order(cls.buyer, [create_product(create_seller())])
+
+    def setUp(self):
+        self.client = jwt_client(self.seller.user)
+        self.order = create_order(self.buyer, [self.product])
+
+    def transition(self, tx_refs, status):
+        response = self.client.post('/sellers/orders/status/', {'tx_refs': tx_refs, 'status': status}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return {row['tx_ref']: (row['result'], row['delivery_status']) for row in response.data}
+
+    def test_batch_reports_each_order(self):
+        skipped = create_order(self.buyer, [self.product])
+        Order.objects.filter(pk=skipped.pk).update(delivery_status='SHIPPING')
+
+        results = self.transition([self.order.tx_ref, skipped.tx_ref, self.foreign_order.tx_ref, 'missing'], 'PACKING')
+        self.assertEqual(results, {
+            self.order.tx_ref: ('UPDATED', 'PACKING'),
+            skipped.tx_ref: ('INVALID_TRANSITION', 'SHIPPING'),
+            self.foreign_order.tx_ref: ('NOT_FOUND', None),
+            'missing': ('NOT_FOUND', None),
+        })
+        statuses = dict(Order.objects.values_list('tx_ref', 'delivery_status'))
+        self.assertEqual(statuses[skipped.tx_ref], 'SHIPPING')
+        self.assertEqual(statuses[self.foreign_order.tx_ref], 'PENDING')
+
+    def test_invalid_transition_is_not_applied(self):
+        self.assertEqual(self.transition([self.order.tx_ref], 'SUCCESS'),
+                         {self.order.tx_ref: ('INVALID_TRANSITION', 'PENDING')})
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.delivery_status, self.order.date_delivered), ('PENDING', None))
+
+    def test_repeated_transition_is_reported(self):
+        self.transition([self.order.tx_ref], 'PACKING')
+        self.assertEqual(self.transition([self.order.tx_ref], 'PACKING'),
+                         {self.order.tx_ref: ('INVALID_TRANSITION', 'PACKING')})
+
+    def test_status_changed_by_concurrent_request(self):
+        real_update = QuerySet.update
+
+        def racing_update(queryset, **changes):
+            #  Другой запрос изменяет статус заказа между чтением статусов и условным UPDATE.
+            if changes.get('delivery_status') == 'PACKING':
+                real_update(Order.objects.filter(pk=self.order.pk), delivery_status='SHIPPING')
+            return real_update(queryset, **changes)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=racing_update):
+            results = Order.objects.transition_delivery_status([self.order.tx_ref], 'PACKING', seller=self.seller)
+        self.assertEqual(results, {self.order.tx_ref: ('INVALID_TRANSITION', 'SHIPPING')})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.delivery_status, 'SHIPPING')
+
+
+class SalesRollupRebuildTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.product = create_product(cls.seller)
+        cls.buyer = create_user()
+
+    def create_order_at(self, created_at):
+        order = create_order(self.buyer, [self.product])
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+
+    def rollup_days(self):
+        return dict(ProductSalesRollup.objects.filter(seller=self.seller).values_list('day', 'orders'))
+
+    def test_rebuild_includes_whole_end_day(self):
+        utc = datetime.timezone.utc
+        self.create_order_at(datetime.datetime(2025, 3, 1, 0, 0, tzinfo=utc))
+        self.create_order_at(datetime.datetime(2025, 3, 2, 23, 59, 59, 999999, tzinfo=utc))
+        self.create_order_at(datetime.datetime(2025, 3, 3, 0, 0, tzinfo=utc))
+
+        self.assertEqual(rebuild_sales_rollups(datetime.date(2025, 3, 1), datetime.date(2025, 3, 2)), (2, 2))
+        self.assertEqual(self.rollup_days(), {datetime.date(2025, 3, 1): 1, datetime.date(2025, 3, 2): 1})
+
+    def test_backfill_keeps_archived_sales(self):
+        utc = datetime.timezone.utc
+        created_at = datetime.datetime(2024, 1, 10, 12, 0, tzinfo=utc)
+        archived = self.create_order_at(created_at)
+        Order.objects.filter(pk=archived.pk).update(
+            delivery_status='SUCCESS', date_delivered=datetime.datetime(2024, 1, 12, tzinfo=utc))
+        self.create_order_at(created_at)
+        archive_batch(datetime.datetime(2025, 1, 1, tzinfo=utc), batch_size=10)
+        self.assertEqual(ArchivedOrder.objects.count(), 1)
+
+        day = {datetime.date(2024, 1, 10): 2}
+        call_command('backfill_sales_rollups', '--start', '2024-01-10', '--end', '2024-01-10', stdout=io.StringIO())
+        self.assertEqual(self.rollup_days(), day)
+        #  Без параметров границы берутся из обеих таблиц.
+        call_command('backfill_sales_rollups', stdout=io.StringIO())
+        self.assertEqual(self.rollup_days(), day)
+        self.assertTrue(ArchivedOrder.objects.get().sales_recorded)
+
+    def test_backfill_bounds_include_archive_only_days(self):
+        utc = datetime.timezone.utc
+        order = self.create_order_at(datetime.datetime(2023, 6, 1, 9, 0, tzinfo=utc))
+        Order.objects.filter(pk=order.pk).update(
+            delivery_status='SUCCESS', date_delivered=datetime.datetime(2023, 6, 2, tzinfo=utc))
+        archive_batch(datetime.datetime(2025, 1, 1, tzinfo=utc), batch_size=10)
+        self.assertFalse(Order.objects.exists())
+
+        call_command('backfill_sales_rollups', stdout=io.StringIO())
+        self.assertEqual(self.rollup_days(), {datetime.date(2023, 6, 1): 1})
@@ -1,14 +1,21 @@
-from drf_spectacular.utils import extend_schema
+from django.db.models import Count, Sum
+from django.http import StreamingHttpResponse
+from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiTypes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.common.permissions import IsSeller
+from apps.common.paginations import CreatedAtCursorPagination
+from apps.common.permissions import IsSeller, get_request_seller
 from apps.common.utils import set_dict_attr
+from apps.profiles.export import iter_order_lines_csv
 from apps.profiles.models import Order, OrderItem
+from apps.sellers.analytics import sales_report
 from apps.sellers.models import Seller
-from apps.sellers.serializers import SellerSerializer
+from apps.sellers.serializers import SellerSerializer, SalesAnalyticsQuerySerializer, SalesAnalyticsSerializer, \
+    DeliveryStatusBatchSerializer, DeliveryStatusResultSerializer, OrderExportQuerySerializer
 from apps.shop.models import Product, Category
-from apps.shop.serializers import ProductSerializer, CreateProductSerializer, OrderSerializer, CheckItemOrderSerializer
+from apps.shop.serializers import ProductSerializer, CreateProductSerializer, SellerOrderSerializer, \
+    CheckItemOrderSerializer
 
 tags = ['Sellers']
 
@@ -16,6 +23,7 @@ tags = ['Sellers']
 #  представление APIView, обрабатывающее POST-запросы для создания или обновления профиля продавца (Seller)
 class SellersView(APIView):
     serializer_class = SellerSerializer
+    throttle_scope = 'seller_write'
 
     @extend_schema(
         summary='Apply to become a seller',
@@ -52,6 +60,7 @@ class SellersView(APIView):
 class ProductsBySellerView(APIView):
     permission_classes = [IsSeller]
     serializer_class = ProductSerializer
+    throttle_scope = {'POST': 'seller_write'}
 
     @extend_schema(
         summary='Seller Products Fetch',
@@ -62,7 +71,8 @@ class ProductsBySellerView(APIView):
         tags=tags
     )
     def get(self, request, *args, **kwargs):
-        seller = Seller.objects.get_or_none(user=request.user, is_approved=True)
+        #  Администратор без профиля продавца не имеет своих товаров.
+        seller = get_request_seller(request)
         if not seller:
             return Response(data={'message': 'Access is denied'}, status=403)
         products = Product.objects.select_related('category', 'seller', 'seller__user').filter(seller=seller)
@@ -81,7 +91,7 @@ class ProductsBySellerView(APIView):
     # чтобы корректно предустанавливать текст запроса и ответа в Swagger.
     def post(self, request, *args, **kwargs):
         serializer = CreateProductSerializer(data=request.data)
-        seller = Seller.objects.get_or_none(user=request.user, is_approved=True)
+        seller = get_request_seller(request)
         if not seller:
             return Response(data={'message': 'Access is denied'}, status=403)
         if serializer.is_valid():
@@ -104,6 +114,7 @@ class ProductsBySellerView(APIView):
 class SellerProductView(APIView):
     permission_classes = [IsSeller]
     serializer_class = CreateProductSerializer
+    throttle_scope = {'PUT': 'seller_write', 'DELETE': 'seller_write'}
 
     #  Вспомогательный метод, который получает продукт из базы данных по его slug.
     #  Он использует get_or_none, что предотвращает ошибки, если товар не найден.
@@ -111,6 +122,11 @@ class SellerProductView(APIView):
         product = Product.objects.get_or_none(slug=slug)
         return product
 
+    @staticmethod
+    def is_owner(request, product):
+        seller = get_request_seller(request)
+        return seller is not None and product.seller_id == seller.id
+
     @extend_schema(
         summary='Seller Products Update',
         description="""
@@ -123,7 +139,8 @@ class SellerProductView(APIView):
         if not product:
             return Response(data={'message': 'Product does not exist!'}, status=404)
         #  Это критически важная проверка. Она гарантирует, что только продавец может его изменить.
-        elif product.seller != request.user.seller:
+        #  Сравниваются идентификаторы, чтобы не загружать продавца товара отдельным запросом.
+        elif not self.is_owner(request, product):
             return Response(data={'message': 'Access is denied'}, status=403)
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
@@ -155,7 +172,7 @@ class SellerProductView(APIView):
         product = self.get_object(kwargs['slug'])
         if not product:
             return Response(data={'message': 'Product does not exist!'}, status=404)
-        elif product.seller != request.user.seller:
+        elif not self.is_owner(request, product):
             return Response(data={'message': 'Access is denied'}, status=403)
         product.delete()
         return Response(data={'message': 'Product deleted successfully'}, status=200)
@@ -164,30 +181,107 @@ class SellerProductView(APIView):
 #  будет показывать список всех заказов, где продавец участвовал в качестве продавца хотя бы одного товара в заказе.
 class SellerOrdersView(APIView):
     permission_classes = [IsSeller]
-    serializer_class = OrderSerializer
+    serializer_class = SellerOrderSerializer
+    pagination_class = CreatedAtCursorPagination
 
     @extend_schema(
         operation_id='seller_orders',
         summary='Seller Orders Fetch',
         description="""
-            Эта конечная точка возвращает все заказы для определенного продавца.
+            Эта конечная точка возвращает заказы с товарами определенного продавца, от новых к старым,
+            с курсорной пагинацией (параметры cursor и page_size).
+            seller_subtotal и seller_items относятся только к позициям этого продавца.
         """,
         tags=tags
     )
     def get(self, request):
-        #  Получает объект продавца из текущего авторизованного пользователя.
-        #  Предполагается, что модель пользователя имеет отношение seller.
-        seller = request.user.seller
+        #  Получает одобренный профиль продавца текущего пользователя (загружается один раз за запрос).
+        seller = get_request_seller(request)
+        #  У администратора без профиля продавца нет своих заказов: без этой проверки фильтр seller=None
+        #  выбрал бы позиции товаров, продавец которых удален.
+        if not seller:
+            return Response(data={'message': 'Access is denied'}, status=403)
         #  Выполняет запрос к базе данных для получения всех заказов, где хотя бы один элемент заказа (orderitems)
         #  содержит продукт (product), принадлежащий текущему продавцу (seller).
-        #  Заказы сортируются по дате создания в обратном порядке (-created_at).
-        orders = (Order.objects.filter(orderitems__product__seller=seller).order_by('-created_at'))
-        #  Создается сериализатор для сериализации списка заказов.
-        serializer = self.serializer_class(orders, many=True)
-        #  Возвращает HTTP-ответ с кодом 200 (OK) и сериализованными данными заказов.
+        #  Агрегация группирует строки по заказу, поэтому каждый заказ возвращается один раз,
+        #  а сумма и количество считаются только по позициям этого продавца.
+        orders = (
+            Order.objects.filter(orderitems__product__seller=seller)
+            .annotate(seller_subtotal=Sum('orderitems__line_total'), seller_items=Count('orderitems'))
+            .select_related('user')
+        )
+        #  Курсорная пагинация сортирует заказы по дате создания в обратном порядке (-created_at).
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        #  Создается сериализатор для сериализации страницы заказов.
+        serializer = self.serializer_class(page, many=True)
+        #  Возвращает HTTP-ответ со ссылками next/previous и сериализованными данными заказов.
+        return paginator.get_paginated_response(serializer.data)
+
+
+#  Пакетное изменение статуса доставки заказов продавца (например, после отгрузки партии со склада).
+class SellerOrdersStatusView(APIView):
+    permission_classes = [IsSeller]
+    serializer_class = DeliveryStatusResultSerializer
+    throttle_scope = 'seller_write'
+
+    @extend_schema(
+        summary='Seller Orders Delivery Status Update',
+        description="""
+            Эта конечная точка переводит заказы с указанными tx_ref в новый статус доставки одним запросом.
+            Переход допускается только из предыдущего статуса (PENDING → PACKING → SHIPPING → ARRIVING → SUCCESS).
+            Продавец может изменять только заказы со своими товарами. Для каждого tx_ref возвращается результат:
+            UPDATED, NOT_FOUND или INVALID_TRANSITION (с текущим статусом заказа).
+        """,
+        tags=tags,
+        request=DeliveryStatusBatchSerializer,
+        responses=DeliveryStatusResultSerializer(many=True),
+    )
+    def post(self, request):
+        #  Администратор может изменять любые заказы.
+        seller = None if request.user.is_staff else get_request_seller(request)
+        serializer = DeliveryStatusBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        #  Повторяющиеся tx_ref учитываются один раз, порядок сохраняется.
+        tx_refs = list(dict.fromkeys(data['tx_refs']))
+        results = Order.objects.transition_delivery_status(tx_refs, data['status'], seller=seller)
+        serializer = self.serializer_class([
+            {'tx_ref': tx_ref, 'result': result, 'delivery_status': delivery_status}
+            for tx_ref, (result, delivery_status) in results.items()
+        ], many=True)
         return Response(data=serializer.data, status=200)
 
 
+#  Выгрузка позиций заказов продавца в CSV для бухгалтерии. Ответ передается потоком по мере чтения строк,
+#  поэтому выгрузка за любой период не собирается в памяти целиком.
+class SellerOrdersExportView(APIView):
+    permission_classes = [IsSeller]
+
+    @extend_schema(
+        summary='Seller Orders CSV Export',
+        description="""
+            Эта конечная точка выгружает позиции заказов продавца в CSV, по возрастанию даты заказа.
+            Фильтры: start и end (даты заказа включительно), delivery_status, payment_status.
+            Администратор получает позиции всех продавцов.
+        """,
+        tags=tags,
+        parameters=[OrderExportQuerySerializer],
+        responses={(200, 'text/csv'): OpenApiResponse(response=OpenApiTypes.STR)},
+    )
+    def get(self, request):
+        #  Администратор выгружает заказы всех продавцов.
+        seller = None if request.user.is_staff else get_request_seller(request)
+        query = OrderExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        filters = query.validated_data
+        response = StreamingHttpResponse(
+            iter_order_lines_csv(seller=seller, **filters), content_type='text/csv; charset=utf-8')
+        period = '-'.join(str(filters[key]) for key in ('start', 'end') if key in filters) or 'all'
+        response['Content-Disposition'] = f'attachment; filename="orders-{period}.csv"'
+        return response
+
+
 #  возвращает список элементов заказов (товаров) для конкретного заказа, принадлежащего данному продавцу
 class SellerOrderItemView(APIView):
     permission_classes = [IsSeller]
@@ -202,16 +296,46 @@ class SellerOrderItemView(APIView):
         tags=tags
     )
     def get(self, request, **kwargs):
-        #  Получение объекта продавца.
-        seller = request.user.seller
+        #  Получение профиля продавца (загружается один раз за запрос).
+        seller = get_request_seller(request)
+        if not seller:
+            return Response(data={'message': 'Access is denied'}, status=403)
         #  Получение заказа по tx_ref (идентификатор транзакции), передаваемому в параметрах URL.
         #  get_or_none возвращает None, если заказ не найден.
         order = Order.objects.get_or_none(tx_ref=kwargs['tx_ref'])
         if not order:
             return Response(data={'message': 'Order does not exist!'}, status=404)
         #  Получение элементов заказа, учитывая, что они принадлежат найденному заказу и продавцу.
-        order_items = OrderItem.objects.filter(order=order, product__seller=seller)
+        order_items = OrderItem.objects.filter(order=order, product__seller=seller).select_related(
+            'product', 'product__category')
         #  Сериализация элементов заказа.
         serializer = self.serializer_class(order_items, many=True)
         #  Возврат ответа
         return Response(data=serializer.data, status=200)
+
+
+#  Аналитика продаж продавца: выручка и количество по дням, неделям или месяцам, рейтинги товаров и покупателей.
+#  Данные читаются из дневных агрегатов, которые обновляются после каждого оформленного заказа.
+class SellerAnalyticsView(APIView):
+    permission_classes = [IsSeller]
+    serializer_class = SalesAnalyticsSerializer
+
+    @extend_schema(
+        summary='Seller Sales Analytics',
+        description="""
+            Эта конечная точка возвращает продажи продавца за диапазон дат (start, end; по умолчанию последние 30 дней),
+            сгруппированные по периодам (period: day, week или month), и рейтинги товаров и покупателей (limit).
+        """,
+        tags=tags,
+        parameters=[SalesAnalyticsQuerySerializer],
+    )
+    def get(self, request):
+        seller = get_request_seller(request)
+        if not seller:
+            return Response(data={'message': 'Access is denied'}, status=403)
+        query = SalesAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        report = sales_report(seller, params['start'], params['end'], params['period'], params['limit'])
+        serializer = self.serializer_class(report)
+        return Response(data=serializer.data, status=200)
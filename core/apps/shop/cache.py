@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.shop.models import Product
+
+PRODUCT_CACHE_KEY = 'shop:product:{}'
+
+
+def product_cache_key(product_id) -> str:
+    return PRODUCT_CACHE_KEY.format(product_id)
+
+
+def get_cached_products(product_ids) -> dict:
+    """
+    Возвращает продукты (вместе с продавцом) по их идентификаторам, используя кеш.
+
+    Все ключи читаются одним обращением к кешу (get_many), а недостающие продукты
+    загружаются из базы данных одним запросом и записываются в кеш.
+
+    Args:
+        product_ids (Iterable): Идентификаторы продуктов.
+
+    Возвращает:
+        dict: Словарь {id продукта: Product}. Удаленные продукты в словарь не попадают.
+    """
+    keys = {product_cache_key(product_id): product_id for product_id in product_ids}
+    cached = cache.get_many(keys.keys())
+    products = {keys[key]: product for key, product in cached.items()}
+    missing = [product_id for key, product_id in keys.items() if key not in cached]
+    if missing:
+        loaded = Product.objects.using('default').select_related('seller', 'seller__user').in_bulk(missing)
+        cache.set_many(
+            {product_cache_key(product_id): product for product_id, product in loaded.items()},
+            settings.PRODUCT_CACHE_TIMEOUT,
+        )
+        products.update(loaded)
+    return {str(product_id): product for product_id, product in products.items()}
+
+
+def invalidate_products(product_ids) -> None:
+    cache.delete_many([product_cache_key(product_id) for product_id in product_ids])
@@ -0,0 +1,242 @@
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.profiles.models import OrderItem
+from apps.shop.cache import get_cached_products
+from apps.shop.models import DirtyCart
+
+CART_CACHE_KEY = 'shop:cart:{}'
+CART_TOUCHED_CACHE_KEY = 'shop:cart:touched:{}'
+CART_DIRTY_CACHE_KEY = 'shop:cart:dirty:{}'
+
+
+def build_cart_summary(groups):
+    """
+    Собирает итог корзины из строк, сгруппированных по продавцу.
+
+    Args:
+        groups (Iterable): Словари с ключами seller_slug, seller_name, items, units и subtotal.
+    """
+    sellers = [
+        {**group, 'subtotal': Decimal(group['subtotal'] or 0).quantize(Decimal('0.01'))}
+        for group in groups
+    ]
+    return {
+        'items': sum(seller['items'] for seller in sellers),
+        'units': sum(seller['units'] for seller in sellers),
+        'subtotal': sum((seller['subtotal'] for seller in sellers), Decimal('0.00')),
+        'sellers': sellers,
+    }
+
+
+class DatabaseCartStorage:
+    """
+    Хранилище корзины в таблице OrderItem (строки с order IS NULL).
+
+    Каждое изменение корзины сразу записывается в базу данных.
+    """
+
+    def items(self, user):
+        return OrderItem.objects.filter(user=user, order=None).select_related(
+            'product', 'product__seller', 'product__seller__user')
+
+    def summary(self, user):
+        """
+        Итог корзины, посчитанный одним запросом с группировкой по продавцу.
+        """
+        groups = (
+            OrderItem.objects.filter(user=user, order=None)
+            .values(seller_slug=F('product__seller__slug'), seller_name=F('product__seller__business_name'))
+            .annotate(
+                items=Count('id'),
+                units=Sum('quantity'),
+                subtotal=Sum(ExpressionWrapper(F('quantity') * F('product__price_current'),
+                                               output_field=DecimalField(max_digits=12, decimal_places=2))),
+            )
+            #  Позиции товаров без продавца собираются в группу с seller_name = None, она идет первой.
+            .order_by(F('seller_name').asc(nulls_first=True))
+        )
+        return build_cart_summary(groups)
+
+    def toggle(self, user, product, quantity):
+        if quantity == 0:
+            OrderItem.objects.remove_cart_item(user, product)
+            return None, False
+        return OrderItem.objects.upsert_cart_item(user, product, quantity)
+
+    def apply_batch(self, user, quantities):
+        """
+        Применяет набор изменений {product: quantity} к корзине одной транзакцией.
+
+        Выполняется не более двух запросов: DELETE для количества 0 и пакетный INSERT ... ON CONFLICT DO UPDATE
+        для остальных товаров, поэтому параллельное добавление того же товара не нарушает уникальный индекс
+        открытых позиций корзины.
+        """
+        removed = [product for product, quantity in quantities.items() if quantity == 0]
+        upserted = {product: quantity for product, quantity in quantities.items() if quantity != 0}
+        with transaction.atomic():
+            if removed:
+                OrderItem.objects.filter(user=user, order=None, product__in=removed).delete()
+            if upserted:
+                OrderItem.objects.upsert_cart_items(user, upserted)
+
+    def flush(self, user_id):
+        pass
+
+    def flush_idle(self, idle_seconds):
+        return 0
+
+    def clear(self, user_id):
+        pass
+
+
+class CacheCartStorage:
+    """
+    Хранилище корзины в кеше Django с отложенной записью в базу данных.
+
+    Корзина хранится в кеше как словарь {id продукта: [количество, время добавления]}, цены подставляются
+    из кеша продуктов. В таблицу OrderItem корзина записывается только при оформлении заказа (flush)
+    или командой flush_idle_carts для корзин, которые давно не изменялись. Пока корзины нет в кеше,
+    она читается из базы данных, поэтому переключение режима не теряет уже сохраненные корзины.
+
+    Кеш - единственная копия корзины до записи, поэтому этот режим требует общего для всех процессов
+    кеша без вытеснения (Redis с persistence и maxmemory-policy noeviction). С кешем в памяти процесса
+    проверка shop.E001 не дает запустить приложение.
+    """
+
+    def _key(self, user_id):
+        return CART_CACHE_KEY.format(user_id)
+
+    def _load(self, user_id):
+        cart = cache.get(self._key(user_id))
+        if cart is None:
+            rows = OrderItem.objects.filter(user_id=user_id, order=None).values_list(
+                'product_id', 'quantity', 'created_at')
+            cart = {str(product_id): [quantity, created_at.timestamp()] for product_id, quantity, created_at in rows}
+        return cart
+
+    def _store(self, user_id, cart):
+        cache.set_many({
+            self._key(user_id): cart,
+            CART_TOUCHED_CACHE_KEY.format(user_id): time.time(),
+        }, settings.CART_CACHE_TIMEOUT)
+        #  Отметка о несохраненной корзине у каждого пользователя своя, поэтому параллельные изменения
+        #  разных корзин не перезаписывают друг друга. Строка DirtyCart создается только при первом
+        #  изменении после записи в базу данных: cache.add атомарен и пропускает повторные вызовы.
+        if cache.add(CART_DIRTY_CACHE_KEY.format(user_id), True, settings.CART_CACHE_TIMEOUT):
+            DirtyCart.objects.get_or_create(user_id=user_id)
+
+    def items(self, user):
+        cart = self._load(user.pk)
+        products = get_cached_products(cart.keys())
+        orderitems = [
+            OrderItem(user=user, product=products[product_id], quantity=quantity)
+            for product_id, (quantity, added_at) in sorted(cart.items(), key=lambda item: -item[1][1])
+            if product_id in products
+        ]
+        return orderitems
+
+    def summary(self, user):
+        #  Итог считается по корзине и продуктам из кеша, без запросов к базе данных.
+        #  Группировка и порядок групп совпадают с DatabaseCartStorage.summary, включая товары без продавца.
+        groups = {}
+        for orderitem in self.items(user):
+            seller = orderitem.product.seller
+            group = groups.setdefault(seller and seller.pk, {
+                'seller_slug': seller and seller.slug, 'seller_name': seller and seller.business_name,
+                'items': 0, 'units': 0, 'subtotal': Decimal('0.00'),
+            })
+            group['items'] += 1
+            group['units'] += orderitem.quantity
+            group['subtotal'] += orderitem.quantity * orderitem.product.price_current
+        return build_cart_summary(sorted(
+            groups.values(), key=lambda group: (group['seller_name'] is not None, group['seller_name'] or '')))
+
+    def toggle(self, user, product, quantity):
+        cart = self._load(user.pk)
+        product_id = str(product.pk)
+        created = product_id not in cart
+        if quantity == 0:
+            cart.pop(product_id, None)
+            orderitem, created = None, False
+        else:
+            added_at = time.time() if created else cart[product_id][1]
+            cart[product_id] = [quantity, added_at]
+            orderitem = OrderItem(user=user, product=product, quantity=quantity)
+        self._store(user.pk, cart)
+        return orderitem, created
+
+    def apply_batch(self, user, quantities):
+        cart = self._load(user.pk)
+        now = time.time()
+        for product, quantity in quantities.items():
+            product_id = str(product.pk)
+            if quantity == 0:
+                cart.pop(product_id, None)
+            else:
+                cart[product_id] = [quantity, cart[product_id][1] if product_id in cart else now]
+        self._store(user.pk, cart)
+
+    def flush(self, user_id):
+        """
+        Записывает корзину пользователя из кеша в таблицу OrderItem одной транзакцией.
+
+        Отметки о несохраненной корзине снимаются до чтения корзины из кеша: изменение, сделанное
+        после чтения, заново создаст отметку и будет записано следующим вызовом.
+        """
+        DirtyCart.objects.filter(user_id=user_id).delete()
+        cache.delete(CART_DIRTY_CACHE_KEY.format(user_id))
+        cart = cache.get(self._key(user_id))
+        if cart is not None:
+            with transaction.atomic():
+                existing = {
+                    str(item.product_id): item
+                    for item in OrderItem.objects.select_for_update().filter(user_id=user_id, order=None)
+                }
+                OrderItem.objects.filter(
+                    id__in=[item.id for product_id, item in existing.items() if product_id not in cart]
+                ).delete()
+                changed = []
+                for product_id, (quantity, added_at) in cart.items():
+                    item = existing.get(product_id)
+                    if item and item.quantity != quantity:
+                        item.quantity = quantity
+                        item.updated_at = timezone.now()
+                        changed.append(item)
+                OrderItem.objects.bulk_update(changed, ['quantity', 'updated_at'])
+                OrderItem.objects.bulk_create([
+                    OrderItem(user_id=user_id, product_id=product_id, quantity=quantity)
+                    for product_id, (quantity, added_at) in cart.items() if product_id not in existing
+                ])
+
+    def flush_idle(self, idle_seconds):
+        """
+        Записывает в базу данных корзины, которые не изменялись дольше idle_seconds.
+
+        Возвращает:
+            int: Количество записанных корзин.
+        """
+        threshold = time.time() - idle_seconds
+        user_ids = list(DirtyCart.objects.values_list('user_id', flat=True))
+        touched = cache.get_many([CART_TOUCHED_CACHE_KEY.format(user_id) for user_id in user_ids])
+        #  Если времени изменения нет в кеше, корзина тоже вытеснена: flush только снимет отметку.
+        idle = [user_id for user_id in user_ids
+                if touched.get(CART_TOUCHED_CACHE_KEY.format(user_id), 0) <= threshold]
+        for user_id in idle:
+            self.flush(user_id)
+        return len(idle)
+
+    def clear(self, user_id):
+        cache.delete_many([self._key(user_id), CART_TOUCHED_CACHE_KEY.format(user_id)])
+
+
+#  Возвращает хранилище корзины, выбранное в настройке CART_STORAGE.
+def get_cart_storage():
+    return import_string(settings.CART_STORAGE)()
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from apps.common.utils import is_shared_cache
+
+
+@register()
+def check_cart_cache(app_configs, **kwargs):
+    """
+    Хранилище CacheCartStorage держит корзину только в кеше до записи в базу данных,
+    поэтому кеш в памяти процесса теряет корзины и не виден другим процессам.
+    """
+    if settings.CART_STORAGE == 'apps.shop.cart.CacheCartStorage' and not is_shared_cache():
+        return [Error(
+            'CacheCartStorage requires a shared persistent cache.',
+            hint='Configure CACHES["default"] with Redis or Memcached, or use DatabaseCartStorage.',
+            id='shop.E001',
+        )]
+    return []
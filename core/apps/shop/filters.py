@@ -1,5 +1,6 @@
 import django_filters
 
+from apps.shop.inventory import stock_level_expression
 from apps.shop.models import Product
 
 
@@ -12,11 +13,16 @@ class ProductFilter(django_filters.FilterSet):
     #  Фильтрует продукты с количеством на складе (in_stock) больше или равным значению in_stock, переданному в запросе.
     #  Поле in_stock в модели — это числовое поле, представляющее количество товаров на складе.
     #  lookup_expr='gte' используется для фильтрации по количеству, большему или равному указанному.
-    in_stock = django_filters.NumberFilter(lookup_expr='gte')
+    #  Для товаров с разделенным остатком (stock_shard_count > 0) остаток считается как сумма строк StockShard,
+    #  поэтому фильтр применяется к аннотации stock_level, а не напрямую к полю in_stock.
+    in_stock = django_filters.NumberFilter(method='filter_in_stock')
     #  Фильтрует продукты, дата создания которых (created_at) больше или равна значению created_at,
     #  переданному в запросе.  lookup_expr='gte' определяет оператор сравнения.
     created_at = django_filters.DateTimeFilter(lookup_expr='gte')
 
+    def filter_in_stock(self, queryset, name, value):
+        return queryset.annotate(stock_level=stock_level_expression()).filter(stock_level__gte=value)
+
     #  метаданные для FilterSet
     class Meta:
         #  Указывает модель, к которой применяются фильтры.
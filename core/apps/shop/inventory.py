@@ -0,0 +1,128 @@
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+
+from apps.shop.models import Product, StockShard
+
+STOCK_LEVEL_CACHE_KEY = 'shop:stock:{}'
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_id):
+        super().__init__(f'Not enough stock for product {product_id}')
+        self.product_id = product_id
+
+
+def stock_level_expression():
+    """
+    Выражение для annotate(), возвращающее доступный остаток товара в SQL:
+    сумму строк StockShard для товаров с разделенным остатком и in_stock для остальных.
+    """
+    shards_total = Subquery(
+        StockShard.objects.filter(product_id=OuterRef('pk')).values('product_id')
+        .annotate(total=Sum('quantity')).values('total')[:1]
+    )
+    return Case(
+        When(stock_shard_count__gt=0, then=Coalesce(shards_total, 0)),
+        default=F('in_stock'),
+        output_field=IntegerField(),
+    )
+
+
+def get_stock_level(product_id):
+    """
+    Возвращает сумму остатка по строкам StockShard из кеша (время жизни STOCK_LEVEL_CACHE_TIMEOUT).
+    """
+    def load():
+        #  Сумма читается с основной базы, чтобы в кеш не попал устаревший остаток с реплики.
+        shards = StockShard.objects.using('default').filter(product_id=product_id)
+        return shards.aggregate(total=Sum('quantity'))['total'] or 0
+
+    return cache.get_or_set(STOCK_LEVEL_CACHE_KEY.format(product_id), load, settings.STOCK_LEVEL_CACHE_TIMEOUT)
+
+
+def enable_sharding(product, shards=None):
+    """
+    Переводит товар в режим разделенного остатка: in_stock распределяется между shards строками StockShard.
+    """
+    shards = shards or settings.STOCK_SHARDS
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        if product.stock_shard_count:
+            return product
+        base, extra = divmod(max(product.in_stock, 0), shards)
+        StockShard.objects.bulk_create([
+            StockShard(product=product, index=index, quantity=base + (1 if index < extra else 0))
+            for index in range(shards)
+        ])
+        product.stock_shard_count = shards
+        product.in_stock = 0
+        product.save(update_fields=['stock_shard_count', 'in_stock', 'updated_at'])
+    cache.delete(STOCK_LEVEL_CACHE_KEY.format(product.pk))
+    return product
+
+
+def disable_sharding(product):
+    """
+    Возвращает товар в обычный режим: сумма строк StockShard записывается в in_stock.
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        if not product.stock_shard_count:
+            return product
+        shards = StockShard.objects.select_for_update().filter(product=product)
+        product.in_stock = shards.aggregate(total=Sum('quantity'))['total'] or 0
+        shards.delete()
+        product.stock_shard_count = 0
+        product.save(update_fields=['stock_shard_count', 'in_stock', 'updated_at'])
+    cache.delete(STOCK_LEVEL_CACHE_KEY.format(product.pk))
+    return product
+
+
+def _reserve_sharded(product_id, quantity, shards):
+    #  Начинаем со случайной строки и перебираем остальные по кругу. Пока остатка много,
+    #  списание занимает один условный UPDATE, а параллельные заказы попадают в разные строки.
+    start = random.randrange(shards)
+    for offset in range(shards):
+        updated = StockShard.objects.filter(
+            product_id=product_id, index=(start + offset) % shards, quantity__gte=quantity,
+        ).update(quantity=F('quantity') - quantity)
+        if updated:
+            return
+    #  Ни в одной строке нет нужного количества целиком: списываем из нескольких строк,
+    #  блокируя их в порядке номера, чтобы избежать взаимоблокировок.
+    remaining = quantity
+    locked = list(StockShard.objects.select_for_update().filter(product_id=product_id, quantity__gt=0)
+                  .order_by('index'))
+    if sum(shard.quantity for shard in locked) < quantity:
+        raise OutOfStock(product_id)
+    for shard in locked:
+        taken = min(shard.quantity, remaining)
+        shard.quantity -= taken
+        remaining -= taken
+        if not remaining:
+            break
+    StockShard.objects.bulk_update(locked, ['quantity'])
+
+
+def reserve_stock(lines):
+    """
+    Списывает остаток по позициям заказа. Должна вызываться внутри транзакции: при нехватке
+    остатка возбуждается OutOfStock, и транзакция откатывает уже выполненные списания.
+
+    Args:
+        lines (Iterable): Кортежи (id продукта, количество, Product.stock_shard_count).
+    """
+    #  Товары обрабатываются в порядке id, чтобы параллельные заказы блокировали строки в одном порядке.
+    for product_id, quantity, shards in sorted(lines, key=lambda line: str(line[0])):
+        if shards:
+            _reserve_sharded(product_id, quantity, shards)
+            #  Кешированная сумма сбрасывается только после фиксации транзакции.
+            transaction.on_commit(lambda key=STOCK_LEVEL_CACHE_KEY.format(product_id): cache.delete(key))
+        elif not Product.objects.filter(pk=product_id, in_stock__gte=quantity).update(
+                in_stock=F('in_stock') - quantity):
+            raise OutOfStock(product_id)
@@ -0,0 +1,138 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.profiles.models import ShippingAddress
+from apps.sellers.models import Seller
+from apps.shop.inventory import enable_sharding
+from apps.shop.models import Category, Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет пропускную способность добавления в корзину и оформления заказов одного товара '
+        'с высоким спросом: с обычным и разделенным остатком и, для SQLite, с разными профилями '
+        'соединения (SQLITE_PROFILES). Создает и затем удаляет тестовые данные - '
+        'запускайте только на базе данных для разработки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Количество параллельных покупателей.')
+        parser.add_argument('--checkouts', type=int, default=50, help='Количество заказов на одного покупателя.')
+        parser.add_argument('--shards', type=int, default=8, help='Количество строк StockShard.')
+        parser.add_argument('--modes', nargs='+', choices=['plain', 'sharded'], default=['plain', 'sharded'])
+        parser.add_argument('--sqlite-profiles', nargs='+', choices=list(settings.SQLITE_PROFILES),
+                            help='Профили соединения SQLite для сравнения (по умолчанию - текущие настройки).')
+
+    #  Все покупатели обращаются с одного адреса, поэтому ограничение частоты запросов отключается.
+    @override_settings(THROTTLE_ENABLED=False)
+    def handle(self, *args, **options):
+        profiles = options['sqlite_profiles'] or [None]
+        if options['sqlite_profiles'] and connection.vendor != 'sqlite':
+            raise CommandError('--sqlite-profiles can only be used with the SQLite backend.')
+        self.stdout.write(
+            f"{'profile':<10}{'mode':<10}{'threads':>8}{'ok':>8}{'errors':>8}{'carts/s':>10}{'checkouts/s':>14}"
+            f"{'cart p50':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        )
+        initial_options = connection.settings_dict['OPTIONS']
+        try:
+            for profile in profiles:
+                if profile:
+                    self.use_sqlite_profile(settings.SQLITE_PROFILES[profile])
+                for mode in options['modes']:
+                    self.run_mode(profile or 'current', mode, options)
+        finally:
+            self.use_sqlite_profile(initial_options)
+
+    def use_sqlite_profile(self, sqlite_options):
+        #  Все потоки создают соединения по одному словарю настроек, поэтому достаточно заменить в нем
+        #  OPTIONS и закрыть текущее соединение. Новое соединение сразу применяет PRAGMA, в том числе
+        #  journal_mode, который сохраняется в файле базы.
+        connections.close_all()
+        connection.settings_dict['OPTIONS'] = sqlite_options
+        connection.ensure_connection()
+
+    def run_mode(self, profile, mode, options):
+        run_id = uuid.uuid4().hex[:8]
+        product, buyers = self.create_fixtures(run_id, options['threads'], options['threads'] * options['checkouts'])
+        if mode == 'sharded':
+            product = enable_sharding(product, options['shards'])
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                results = list(executor.map(
+                    lambda buyer: self.run_buyer(buyer, product.slug, options['checkouts']), buyers))
+            elapsed = time.perf_counter() - started
+        finally:
+            self.delete_fixtures(product, buyers)
+        cart_latencies = sorted(latency for latencies, _, _ in results for latency in latencies)
+        latencies = sorted(latency for _, buyer_latencies, _ in results for latency in buyer_latencies)
+        errors = sum(buyer_errors for _, _, buyer_errors in results)
+        cart_p50 = cart_latencies[len(cart_latencies) // 2] * 1000 if cart_latencies else 0
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+        self.stdout.write(
+            f"{profile:<10}{mode:<10}{options['threads']:>8}{len(latencies):>8}{errors:>8}"
+            f"{len(cart_latencies) / elapsed:>10.1f}{len(latencies) / elapsed:>14.1f}"
+            f"{cart_p50:>10.1f}{p50:>10.1f}{p95:>10.1f}"
+        )
+
+    def create_fixtures(self, run_id, threads, stock):
+        seller_user = User.objects.create_user('Bench', 'Seller', f'bench-seller-{run_id}@example.com', None,
+                                               account_type='SELLER')
+        seller = Seller.objects.create(
+            user=seller_user, business_name=f'Bench {run_id}', inn_identification_number='0', phone_number='0',
+            business_description='bench', business_address='bench', city='bench', postal_code='0',
+            bank_name='bench', bank_bic_number=0, bank_account_number='0', bank_routing_number='0', is_approved=True,
+        )
+        category = Category.objects.create(name=f'Bench {run_id}', image='bench.jpg')
+        product = Product.objects.create(seller=seller, name=f'Bench {run_id}', desc='bench', price_current=1,
+                                         category=category, in_stock=stock, image1='bench.jpg')
+        buyers = []
+        for index in range(threads):
+            buyer = User.objects.create_user('Bench', 'Buyer', f'bench-buyer-{run_id}-{index}@example.com', None)
+            buyer.shipping_id = ShippingAddress.objects.create(user=buyer, full_name='Bench', email=buyer.email).id
+            buyers.append(buyer)
+        return product, buyers
+
+    def delete_fixtures(self, product, buyers):
+        seller = product.seller
+        category = product.category
+        User.objects.filter(id__in=[buyer.id for buyer in buyers]).delete()
+        product.hard_delete()
+        category.delete()
+        seller.user.delete()
+
+    def run_buyer(self, buyer, slug, checkouts):
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(buyer)
+        cart_latencies = []
+        latencies = []
+        errors = 0
+        try:
+            for _ in range(checkouts):
+                started = time.perf_counter()
+                try:
+                    response = client.post('/shop/cart/', {'slug': slug, 'quantity': 1})
+                    if response.status_code not in (200, 201):
+                        errors += 1
+                        continue
+                    cart_latencies.append(time.perf_counter() - started)
+                    response = client.post('/shop/checkout/', {'shipping_id': str(buyer.shipping_id)})
+                except Exception:
+                    errors += 1
+                    continue
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+        finally:
+            connection.close()
+        return cart_latencies, latencies, errors
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.shop.cart import get_cart_storage
+
+
+class Command(BaseCommand):
+    help = 'Записывает в базу данных корзины из кеша, которые не изменялись дольше заданного времени.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idle-seconds', type=int, default=settings.CART_IDLE_FLUSH_SECONDS,
+            help='Сколько секунд корзина должна простаивать, чтобы быть записанной.',
+        )
+
+    def handle(self, *args, **options):
+        flushed = get_cart_storage().flush_idle(options['idle_seconds'])
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} cart(s)'))
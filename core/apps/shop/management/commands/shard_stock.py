@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.shop.inventory import disable_sharding, enable_sharding, get_stock_level
+from apps.shop.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Включает или выключает разделенный остаток (StockShard) для товара с высоким спросом.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help='Slug товара.')
+        parser.add_argument('--shards', type=int, default=None, help='Количество строк StockShard.')
+        parser.add_argument('--disable', action='store_true', help='Вернуть остаток в поле in_stock.')
+
+    def handle(self, *args, **options):
+        product = Product.objects.get_or_none(slug=options['slug'])
+        if not product:
+            raise CommandError('Product does not exist!')
+        if options['disable']:
+            product = disable_sharding(product)
+            self.stdout.write(self.style.SUCCESS(f'{product.slug}: in_stock={product.in_stock}'))
+        else:
+            product = enable_sharding(product, options['shards'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{product.slug}: {product.stock_shard_count} shards, stock={get_stock_level(product.pk)}'))
@@ -43,6 +43,8 @@ class Product(IsDeletedModel):
         price_current (десятичная): Текущая цена продукта.
         category (ForeignKey): Категория, к которой относится продукт.
         in_stock (int): Количество товара на складе.
+        stock_shard_count (int): Количество строк StockShard, между которыми разделен остаток
+            (для товаров с высоким спросом). 0 - остаток хранится в поле in_stock.
         image1 (ImageField): Первое изображение товара.
         image2 (ImageField): Второе изображение товара.
         image3 (ImageField): Третье изображение продукта.
@@ -56,6 +58,8 @@ class Product(IsDeletedModel):
     price_current = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', null=True)
     in_stock = models.IntegerField(default=5)
+    #  Если больше 0, остаток разделен между строками StockShard, а поле in_stock не используется
+    stock_shard_count = models.PositiveSmallIntegerField(default=0)
 
     #  Разрешено только 3 изображения
     image1 = models.ImageField(upload_to='product_images/')
@@ -65,6 +69,58 @@ class Product(IsDeletedModel):
     def __str__(self):
         return str(self.name)
 
+    @property
+    def available_stock(self):
+        """
+        Возвращает доступный остаток товара. Для товаров с разделенным остатком это
+        кешированная сумма по всем строкам StockShard.
+        """
+        if not self.stock_shard_count:
+            return self.in_stock
+        from apps.shop.inventory import get_stock_level
+        return get_stock_level(self.pk)
+
+
+class StockShard(BaseModel):
+    """
+    Часть остатка товара с разделенным остатком (Product.stock_shard_count).
+
+    Списание остатка при оформлении заказа выбирает случайную строку, поэтому параллельные заказы
+    одного товара блокируют разные строки, а не одну строку Product.
+
+    Атрибуты:
+        product (ForeignKey): Товар, к которому относится часть остатка.
+        index (int): Номер части остатка.
+        quantity (int): Количество товара в этой части остатка.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shards')
+    index = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'index'], name='unique_stock_shard'),
+        ]
+
+    def __str__(self):
+        return f'{self.product} #{self.index}: {self.quantity}'
+
+
+class DirtyCart(BaseModel):
+    """
+    Отметка о корзине в кеше, которая изменилась и еще не записана в таблицу OrderItem.
+
+    Используется хранилищем CacheCartStorage: по этим строкам команда flush_idle_carts находит корзины
+    для записи, потому что перечислить ключи кеша нельзя.
+
+    Атрибуты:
+        user (OneToOneField): Пользователь, корзина которого изменилась.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='dirty_cart')
+
+    def __str__(self):
+        return str(self.user)
+
 
 class Review(IsDeletedModel):
     RATING_CHOICES = ((1, 1), (2, 2), (3, 3), (4, 4), (5, 5))
@@ -32,7 +32,8 @@ class ProductSerializer(serializers.Serializer):
     price_old = serializers.DecimalField(max_digits=10, decimal_places=2)
     price_current = serializers.DecimalField(max_digits=10, decimal_places=2)
     category = CategorySerializer()
-    in_stock = serializers.IntegerField()
+    #  Для товаров с разделенным остатком это кешированная сумма строк StockShard
+    in_stock = serializers.IntegerField(source='available_stock')
     image1 = serializers.ImageField()
     image2 = serializers.ImageField(required=False)
     image3 = serializers.ImageField(required=False)
@@ -76,6 +77,29 @@ class ToggleCartItemSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=0)
 
 
+#  Итог корзины по одному продавцу.
+class CartSellerSummarySerializer(serializers.Serializer):
+    seller_slug = serializers.SlugField()
+    seller_name = serializers.CharField()
+    items = serializers.IntegerField()
+    units = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+#  Итог корзины для значка в шапке сайта: количество позиций и единиц товара, сумма и суммы по продавцам.
+class CartSummarySerializer(serializers.Serializer):
+    items = serializers.IntegerField()
+    units = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    sellers = CartSellerSummarySerializer(many=True)
+
+
+#  Сериализатор для пакетного изменения корзины: список пар (slug, quantity), которые применяются за один запрос.
+#  Используется фронтендом для синхронизации всей корзины после офлайн-редактирования.
+class BatchCartSerializer(serializers.Serializer):
+    items = ToggleCartItemSerializer(many=True, allow_empty=False, max_length=100)
+
+
 #   Сериализатор для валидации данных, связанных с этапом оформления заказа до создания самого заказа.
 class CheckoutSerializer(serializers.Serializer):
     #  Это поле представляет собой идентификатор (UUID) информации о доставке, которое пользователь уже сохранил ранее.
@@ -103,10 +127,10 @@ class OrderSerializer(serializers.Serializer):
     #  что данные для этого поля будут получены из метода get_shipping_details.
     shipping_details = serializers.SerializerMethodField()
     #  Итоговая стоимость товаров в заказе (например без учета доставки).
-    #  source="get_cart_subtotal" указывает на метод модели Order, который вычисляет эту сумму
-    subtotal = serializers.DecimalField(max_digits=100, decimal_places=2, source='get_cart_subtotal')
-    #  Общая стоимость заказа (с учетом доставки). source="get_cart_total" аналогично subtotal
-    total = serializers.DecimalField(max_digits=100, decimal_places=2, source='get_cart_total')
+    #  Читается из поля subtotal, зафиксированного при оформлении заказа, без загрузки позиций заказа.
+    subtotal = serializers.DecimalField(max_digits=100, decimal_places=2)
+    #  Общая стоимость заказа (с учетом доставки), зафиксированная при оформлении заказа.
+    total = serializers.DecimalField(max_digits=100, decimal_places=2)
 
     #  Этот метод используется для получения данных о доставке. Он использует ShippingAddressSerializer
     #  для сериализации данных об адресе доставки и возвращает сериализованные данные.
@@ -117,6 +141,18 @@ class OrderSerializer(serializers.Serializer):
         return ShippingAddressSerializer(obj).data
 
 
+#  Заказ в ленте продавца. Кроме общих сумм заказа содержит сумму и количество позиций только этого продавца
+#  (аннотации seller_subtotal и seller_items, которые считаются в SQL).
+class SellerOrderSerializer(OrderSerializer):
+    seller_subtotal = serializers.DecimalField(max_digits=100, decimal_places=2)
+    seller_items = serializers.IntegerField()
+
+
+#  Заказ в результатах поиска поддержки: общие поля заказа и дата оформления.
+class StaffOrderSerializer(OrderSerializer):
+    created_at = serializers.DateTimeField()
+
+
 class ItemProductSerializer(serializers.Serializer):
     name = serializers.CharField()
     slug = serializers.SlugField()
@@ -131,13 +167,16 @@ class ItemProductSerializer(serializers.Serializer):
 
 #  Это сериализатор для представления позиции в заказе.
 #  В сущности, CheckItemOrderSerializer использует ItemProductSerializer для вложенного представления
-#  товара в позиции заказа. total вычисляется динамически (умножением quantity на price_current).
+#  товара в позиции заказа. total - стоимость позиции, зафиксированная при оформлении заказа.
 class CheckItemOrderSerializer(serializers.Serializer):
     #  вложенный сериализатор ItemProductSerializer для представления товара
     product = ItemProductSerializer()
     #  целое число, количество товара
     quantity = serializers.IntegerField()
-    #  число с плавающей точкой, общая стоимость позиции; вычисляется методом  get_total модели OrderItem
+    #  цена за единицу товара на момент оформления заказа
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    #  число с плавающей точкой, общая стоимость позиции; get_total модели OrderItem возвращает
+    #  зафиксированную стоимость line_total
     total = serializers.FloatField(source='get_total')
 
 
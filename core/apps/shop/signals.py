@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.sellers.models import Seller
+from apps.shop.cache import invalidate_products
+from apps.shop.models import Product
+
+
+#  Кеш продуктов используется корзиной для подстановки цен, поэтому любое изменение продукта
+#  (в том числе мягкое удаление, которое выполняется через save) сбрасывает его запись в кеше.
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    invalidate_products([instance.pk])
+
+
+#  Данные продавца сериализуются вместе с товаром в корзине, поэтому при изменении продавца
+#  сбрасываются записи всех его продуктов.
+@receiver(post_save, sender=Seller)
+def invalidate_seller_products_cache(sender, instance, **kwargs):
+    invalidate_products(Product.objects.unfiltered().filter(seller=instance).values_list('id', flat=True))
@@ -1,3 +1,239 @@
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
 from django.test import TestCase
 
-# Create your tests here.
+from apps.common.testing import (QueryBudgetMixin, create_category, create_product, create_seller, create_user,
+                                 jwt_client)
+from apps.profiles.models import OrderItem
+from apps.shop.cart import CART_TOUCHED_CACHE_KEY, CacheCartStorage, DatabaseCartStorage
+from apps.shop.inventory import OutOfStock, enable_sharding, get_stock_level, reserve_stock
+from apps.shop.models import Category, DirtyCart, Review, StockShard
+
+
+class CatalogQueryBudgetTest(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = create_seller()
+        cls.category = create_category()
+        cls.product = create_product(cls.seller, cls.category)
+
+    def create_products(self, count):
+        for _ in range(count):
+            create_product(self.seller, self.category)
+
+    def test_categories(self):
+        Category.objects.all().delete()
+        self.assertQueryBudget(1, lambda count: [create_category() for _ in range(count)],
+                               lambda: self.client.get('/shop/categories/'))
+
+    def test_category_products(self):
+        self.assertQueryBudget(2, self.create_products,
+                               lambda: self.client.get(f'/shop/categories/{self.category.slug}/'))
+
+    def test_products(self):
+        self.assertQueryBudget(2, self.create_products, lambda: self.client.get('/shop/products/?page_size=100'))
+
+    def test_products_response_is_paginated(self):
+        self.create_products(2)
+        response = self.client.get('/shop/products/?page_size=2')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_seller_products(self):
+        self.assertQueryBudget(2, self.create_products, lambda: self.client.get(f'/shop/sellers/{self.seller.slug}/'))
+
+    def test_product(self):
+        self.assertQueryBudget(1, self.create_products,
+                               lambda: self.client.get(f'/shop/products/{self.product.slug}/'))
+
+    def test_reviews(self):
+        def create_reviews(count):
+            Review.objects.bulk_create([
+                Review(user=create_user(), product=self.product, rating=5, text='-') for _ in range(count)
+            ])
+
+        client = jwt_client(create_user())
+        #  Пользователь, товар и отзывы.
+        self.assertQueryBudget(3, create_reviews, lambda: client.get(f'/shop/products/{self.product.slug}/reviews/'))
+
+
+class CartQueryBudgetTest(QueryBudgetMixin, TestCase):
+
+    def test_cart(self):
+        user = create_user()
+        seller = create_seller()
+        client = jwt_client(user)
+
+        def create_items(count):
+            OrderItem.objects.bulk_create([
+                OrderItem(user=user, product=create_product(seller), quantity=1) for _ in range(count)
+            ])
+
+        #  Пользователь и позиции корзины вместе с товарами и продавцами.
+        self.assertQueryBudget(2, create_items, lambda: client.get('/shop/cart/'))
+
+    def test_cart_summary(self):
+        user = create_user()
+        client = jwt_client(user)
+
+        def create_items(count):
+            OrderItem.objects.bulk_create([
+                OrderItem(user=user, product=create_product(create_seller()), quantity=1) for _ in range(count)
+            ])
+
+        #  Пользователь и итог корзины, сгруппированный по продавцам.
+        self.assertQueryBudget(2, create_items, lambda: client.get('/shop/cart/summary/'))
+
+
+class CacheCartStorageTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.storage = CacheCartStorage()
+        self.seller = create_seller()
+
+    def test_changes_of_different_carts_are_all_marked_dirty(self):
+        users = [create_user() for _ in range(3)]
+        product = create_product(self.seller)
+        for user in users:
+            self.storage.toggle(user, product, 2)
+        self.storage.toggle(users[0], product, 3)
+        self.assertEqual(set(DirtyCart.objects.values_list('user_id', flat=True)), {user.pk for user in users})
+
+    def test_flush_idle_writes_only_idle_carts(self):
+        idle_user, active_user = create_user(), create_user()
+        product = create_product(self.seller)
+        self.storage.toggle(idle_user, product, 2)
+        self.storage.toggle(active_user, product, 1)
+        cache.set(CART_TOUCHED_CACHE_KEY.format(idle_user.pk), time.time() - 120)
+
+        self.assertEqual(self.storage.flush_idle(60), 1)
+        self.assertEqual(OrderItem.objects.get(user=idle_user, order=None).quantity, 2)
+        self.assertFalse(OrderItem.objects.filter(user=active_user).exists())
+        self.assertEqual(list(DirtyCart.objects.values_list('user_id', flat=True)), [active_user.pk])
+
+    def test_change_after_flush_marks_cart_dirty_again(self):
+        user = create_user()
+        product = create_product(self.seller)
+        self.storage.toggle(user, product, 1)
+        self.storage.flush(user.pk)
+        self.assertFalse(DirtyCart.objects.exists())
+        self.storage.toggle(user, product, 4)
+        self.storage.flush_idle(0)
+        self.assertEqual(OrderItem.objects.get(user=user, order=None).quantity, 4)
+
+    def test_summary_matches_database_storage(self):
+        user = create_user()
+        other_seller = create_seller()
+        products = [
+            create_product(self.seller, price_current='10.50'),
+            create_product(self.seller, price_current='3.25'),
+            create_product(other_seller, price_current='7.00'),
+            create_product(None, price_current='2.00'),
+        ]
+        for quantity, product in enumerate(products, start=1):
+            DatabaseCartStorage().toggle(user, product, quantity)
+
+        summary = CacheCartStorage().summary(user)
+        self.assertEqual(summary, DatabaseCartStorage().summary(user))
+        self.assertEqual(summary['items'], 4)
+        self.assertEqual(summary['sellers'][0]['seller_name'], None)
+
+
+class DatabaseCartStorageTest(TestCase):
+
+    def setUp(self):
+        self.storage = DatabaseCartStorage()
+        self.user = create_user()
+        self.seller = create_seller()
+
+    def test_apply_batch_upserts_and_removes(self):
+        kept, changed, removed, added = [create_product(self.seller) for _ in range(4)]
+        for product in (kept, changed, removed):
+            self.storage.toggle(self.user, product, 1)
+        kept_updated_at = OrderItem.objects.get(product=kept).updated_at
+
+        #  DELETE и пакетный INSERT ... ON CONFLICT внутри SAVEPOINT / RELEASE SAVEPOINT.
+        with self.assertNumQueries(4):
+            self.storage.apply_batch(self.user, {kept: 1, changed: 3, removed: 0, added: 2})
+
+        quantities = dict(OrderItem.objects.filter(user=self.user, order=None).values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {kept.pk: 1, changed.pk: 3, added.pk: 2})
+        self.assertEqual(OrderItem.objects.get(product=kept).updated_at, kept_updated_at)
+
+    def test_apply_batch_updates_row_inserted_by_another_request(self):
+        product = create_product(self.seller)
+        #  Строка, добавленная параллельным запросом, не дает IntegrityError, а обновляется.
+        OrderItem.objects.create(user=self.user, product=product, quantity=1)
+        self.storage.apply_batch(self.user, {product: 5})
+        self.assertEqual(OrderItem.objects.get(user=self.user, order=None, product=product).quantity, 5)
+
+
+class CartToggleTest(TestCase):
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = jwt_client(self.user)
+        self.product = create_product(create_seller())
+
+    def test_duplicate_add_updates_existing_row(self):
+        response = self.client.post('/shop/cart/', {'slug': self.product.slug, 'quantity': 1})
+        self.assertEqual(response.status_code, 201)
+        item = OrderItem.objects.get(user=self.user, order=None, product=self.product)
+
+        response = self.client.post('/shop/cart/', {'slug': self.product.slug, 'quantity': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['message'], 'Item Updated In Cart')
+        items = OrderItem.objects.filter(user=self.user, order=None, product=self.product)
+        self.assertEqual([(row.id, row.quantity) for row in items], [(item.id, 3)])
+
+    def test_zero_quantity_removes_row(self):
+        self.client.post('/shop/cart/', {'slug': self.product.slug, 'quantity': 2})
+        response = self.client.post('/shop/cart/', {'slug': self.product.slug, 'quantity': 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(OrderItem.objects.filter(user=self.user, order=None).exists())
+
+
+class ShardedStockTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product = enable_sharding(create_product(create_seller(), in_stock=10), shards=4)
+
+    def shard_quantities(self):
+        shards = StockShard.objects.filter(product=self.product).order_by('index')
+        return list(shards.values_list('quantity', flat=True))
+
+    def test_enable_sharding_keeps_total(self):
+        self.assertEqual(self.shard_quantities(), [3, 3, 2, 2])
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.in_stock, self.product.available_stock), (0, 10))
+
+    def test_reserve_across_shards(self):
+        #  Ни в одной строке нет 7 единиц, поэтому списание идет из нескольких строк.
+        with transaction.atomic():
+            reserve_stock([(self.product.pk, 7, 4)])
+        self.assertEqual(sum(self.shard_quantities()), 3)
+        self.assertEqual(get_stock_level(self.product.pk), 3)
+
+    def test_out_of_stock_leaves_shards_and_total_unchanged(self):
+        #  Товары обрабатываются в порядке id: разделенный остаток списывается первым, затем не хватает обычного.
+        plain = create_product(create_seller(), in_stock=1, id=uuid.UUID(int=(1 << 128) - 1))
+        self.assertEqual(get_stock_level(self.product.pk), 10)
+        with self.assertRaises(OutOfStock) as raised, transaction.atomic():
+            reserve_stock([(self.product.pk, 5, 4), (plain.pk, 2, 0)])
+        self.assertEqual(raised.exception.product_id, plain.pk)
+        self.assertEqual(self.shard_quantities(), [3, 3, 2, 2])
+        self.assertEqual(get_stock_level(self.product.pk), 10)
+        plain.refresh_from_db()
+        self.assertEqual(plain.in_stock, 1)
+
+    def test_sharded_out_of_stock(self):
+        with self.assertRaises(OutOfStock), transaction.atomic():
+            reserve_stock([(self.product.pk, 11, 4)])
+        self.assertEqual(sum(self.shard_quantities()), 10)
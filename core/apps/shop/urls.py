@@ -1,7 +1,7 @@
 from django.urls import path
 
 from apps.shop.views import CategoriesView, ProductsByCategoryView, ProductsBySellerView, ProductsView, ProductView, \
-    CartView, CheckoutView, ReviewView
+    CartView, CartBatchView, CartSummaryView, CheckoutView, ReviewView
 
 urlpatterns = [
     path("categories/", CategoriesView.as_view()),
@@ -10,6 +10,8 @@ urlpatterns = [
     path("products/", ProductsView.as_view()),
     path("products/<slug:slug>/", ProductView.as_view()),
     path("cart/", CartView.as_view()),
+    path("cart/batch/", CartBatchView.as_view()),
+    path("cart/summary/", CartSummaryView.as_view()),
     path("checkout/", CheckoutView.as_view()),
     path("products/<slug:product_slug>/reviews/", ReviewView.as_view()),
 ]
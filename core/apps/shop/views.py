@@ -1,3 +1,5 @@
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
@@ -6,19 +8,26 @@ from rest_framework.views import APIView
 from apps.common.paginations import CustomPagination
 from apps.common.permissions import IsOwner
 from apps.common.utils import set_dict_attr
+from apps.jobs.models import Job
 from apps.profiles.models import OrderItem, ShippingAddress, Order
+from apps.profiles.tasks import notify_sellers, send_order_confirmation
 from apps.sellers.models import Seller
+from apps.sellers.tasks import record_sales
+from apps.shop.cart import get_cart_storage
 from apps.shop.filters import ProductFilter
+from apps.shop.inventory import OutOfStock, reserve_stock
 from apps.shop.models import Category, Product, Review
 from apps.shop.schema_examples import PRODUCT_PARAM_EXAMPLE
 from apps.shop.serializers import CategorySerializer, ProductSerializer, OrderItemSerializer, ToggleCartItemSerializer, \
-    CheckoutSerializer, OrderSerializer, ReviewSerializer
+    CheckoutSerializer, OrderSerializer, ReviewSerializer, BatchCartSerializer, \
+    CartSummarySerializer
 
 tags = ["Shop"]
 
 
 class CategoriesView(APIView):
     serializer_class = CategorySerializer
+    throttle_scope = 'catalog'
 
     @extend_schema(
         summary='Categories Fetch',
@@ -53,6 +62,7 @@ class CategoriesView(APIView):
 #  Он включает в себя обработку ошибок (если категория не найдена) и оптимизированный запрос к базе данных.
 class ProductsByCategoryView(APIView):
     serializer_class = ProductSerializer
+    throttle_scope = 'catalog'
 
     #  Параметр operation_id, который используется для уникальной идентификации операции API в спецификации OpenAPI
     @extend_schema(
@@ -75,6 +85,7 @@ class ProductsByCategoryView(APIView):
 #  Представление, выводящие все товары интернет магазина
 class ProductsView(APIView):
     serializer_class = ProductSerializer
+    throttle_scope = 'catalog'
     #  кастомный класс пагинации для обработки запросов, который разбивает результаты на страницы по номерам
     pagination_class = CustomPagination
 
@@ -82,10 +93,13 @@ class ProductsView(APIView):
         operation_id='all_products',
         summary='Product Fetch',
         description="""
-            Эта конечная точка возвращает все продукты.
+            Эта конечная точка возвращает продукты постранично (параметры page и page_size):
+            count, next, previous и results с продуктами текущей страницы.
         """,
         tags=tags,
         parameters=PRODUCT_PARAM_EXAMPLE,
+        #  Список с many=True оборачивается в схему страницы по pagination_class представления.
+        responses=ProductSerializer(many=True),
     )
     def get(self, request, *args, **kwargs):
         #  Мы получаем все товары в виде QuerySet в переменную products
@@ -101,10 +115,10 @@ class ProductsView(APIView):
             #  Разбиваем отфильтрованный queryset на страницы согласно настройкам пагинации и параметрам запроса
             #  (например, номер страницы и размер страницы)
             paginated_queryset = paginator.paginate_queryset(queryset, request)
-            #  Сериализуем отфильтрованный queryset в JSON с помощью ProductSerializer
-            serializer = self.serializer_class(queryset, many=True)
-            #  Возвращаем сериализованные данные в ответе API
-            return Response(serializer.data)
+            #  Сериализуем только товары текущей страницы с помощью ProductSerializer
+            serializer = self.serializer_class(paginated_queryset, many=True)
+            #  Возвращаем сериализованные данные вместе с количеством товаров и ссылками на соседние страницы
+            return paginator.get_paginated_response(serializer.data)
         else:
             #  Если параметры невалидны, возвращаем код ошибки 400 (Bad Request) и информацию об ошибках
             return Response(data=filterset.errors, status=400)
@@ -113,6 +127,7 @@ class ProductsView(APIView):
 #  Представление, выводящие все товары одного продавца, получая его slug
 class ProductsBySellerView(APIView):
     serializer_class = ProductSerializer
+    throttle_scope = 'catalog'
 
     @extend_schema(
         summary='Seller Products Fetch',
@@ -133,9 +148,11 @@ class ProductsBySellerView(APIView):
 #  Представление вывода детальной информации о товаре, в нем мы получаем slug товара и выводим всю информацию о товаре
 class ProductView(APIView):
     serializer_class = ProductSerializer
+    throttle_scope = 'catalog'
 
     def get_object(self, slug):
-        product = Product.objects.get_or_none(slug=slug)
+        #  Продавец, его пользователь и категория загружаются тем же запросом, что и товар.
+        product = Product.objects.select_related('category', 'seller', 'seller__user').get_or_none(slug=slug)
         return product
 
     @extend_schema(
@@ -157,6 +174,7 @@ class ProductView(APIView):
 class CartView(APIView):
     permission_classes = [IsOwner]
     serializer_class = OrderItemSerializer
+    throttle_scope = 'cart'
 
     @extend_schema(
         summary='Cart Items Fetch',
@@ -169,11 +187,10 @@ class CartView(APIView):
     def get(self, request, *args, **kwargs):
         # Получаем текущего авторизованного пользователя.
         user = request.user
-        #  Получаем все элементы корзины текущего пользователя (order=None проверяем на то,
-        #  что товары находятся в корзине, а не в оформленном заказе). select_related используем
-        #  для оптимизации запроса, загружая связанные данные о продукте, продавце и пользователе продавца.
-        orderitems = OrderItem.objects.filter(user=user, order=None).select_related(
-            'product', 'product__seller', 'product__seller__user')
+        #  Получаем все элементы корзины текущего пользователя из хранилища корзины (настройка CART_STORAGE).
+        #  В хранилище в базе данных это строки OrderItem с order=None, загруженные вместе с продуктом и продавцом;
+        #  в хранилище в кеше - элементы, собранные из кеша корзины и кеша продуктов.
+        orderitems = get_cart_storage().items(user)
         #  Сериализуем полученные элементы корзины.
         serializer = self.serializer_class(orderitems, many=True)
         #   Возвращаем сериализованные данные.
@@ -206,40 +223,91 @@ class CartView(APIView):
         #  Проверка на существование продукта. Если продукт не найден, возвращает ошибку 404.
         if not product:
             return Response({'message': 'No Product with that slug'}, status=404)
-        #  Попытка обновить существующую запись OrderItem или создать новую.
-        orderitem, created = OrderItem.objects.update_or_create(
-            user=user,  # Пользователь, которому принадлежит товар.
-            order_id=None,  # Указывает, что товар находится в корзине (а не в оформленном заказе).
-            product=product,  # Товар, который нужно добавить/обновить.
-            #  Если запись обновляется, поле quantity будет обновлено значением из запроса.
-            #  Это ключевой момент: функция update_or_create обновляет только указанные поля в defaults.
-            defaults={'quantity': quantity},
-        )
+        #  Добавление, обновление или удаление (при количестве 0) товара в хранилище корзины.
+        #  Хранилище в базе данных делает это одним запросом INSERT ... ON CONFLICT DO UPDATE или DELETE.
+        orderitem, created = get_cart_storage().toggle(user, product, quantity)
+        #  Если количество равно 0, товар удален из корзины, и сообщение изменяется на “Removed From”.
+        if orderitem is None:
+            return Response(data={'message': 'Item Removed From Cart', 'item': None}, status=200)
         resp_message_substring = 'Updated In'  # Инициализация переменной для формирования сообщения ответа.
         status_code = 200  # Инициализация кода статуса.
         #  Если был создан новый OrderItem, код статуса меняется на 201 (Created), и сообщение изменяется на “Added To”.
         if created:
             status_code = 201
             resp_message_substring = 'Added To'
-        #  Если количество равно 0, товар удаляется из корзины, и сообщение изменяется на “Removed From”.
-        if orderitem.quantity == 0:
-            resp_message_substring = 'Removed From'
-            orderitem.delete()  # Удаление записи из базы данных.
-        data = None  # Сбрасывает переменную data.
-        #  Если товар не был удален, сериализует обновленный OrderItem и сохраняет данные в переменной data.
-        if resp_message_substring != 'Removed From':
-            orderitem.product = product
-            serializer = self.serializer_class(orderitem)
-            data = serializer.data
+        #  Сериализует обновленный OrderItem.
+        serializer = self.serializer_class(orderitem)
+        data = serializer.data
         #  Возвращает ответ с сообщением и данными о товаре (если товар не был удален).
         return Response(data={'message': f"Item {resp_message_substring} Cart", 'item': data}, status=status_code)
 
 
+#  Итог корзины без списка товаров. Фронтенд запрашивает его на каждой странице для значка в шапке,
+#  поэтому он считается одним запросом с группировкой (или по кешу для хранилища в кеше).
+class CartSummaryView(APIView):
+    permission_classes = [IsOwner]
+    serializer_class = CartSummarySerializer
+    throttle_scope = 'cart'
+
+    @extend_schema(
+        summary='Cart Summary Fetch',
+        description="""
+            Эта конечная точка возвращает итог корзины: количество позиций и единиц товара,
+            сумму корзины и суммы по продавцам.
+            Требуется аутентификация.
+        """,
+        tags=tags
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = self.serializer_class(get_cart_storage().summary(request.user))
+        return Response(data=serializer.data)
+
+
+#  Пакетное изменение корзины. Фронтенд отправляет всю корзину после офлайн-редактирования одним запросом
+#  вместо отдельного запроса CartView.post на каждый товар.
+class CartBatchView(APIView):
+    permission_classes = [IsOwner]
+    serializer_class = OrderItemSerializer
+    throttle_scope = 'cart'
+
+    @extend_schema(
+        summary='Batch Update Cart',
+        description="""
+            Эта конечная точка позволяет пользователю добавить/обновить/удалить несколько товаров в корзине
+            одним запросом. Если количество равно 0, товар удаляется из корзины.
+            Возвращает корзину после применения всех изменений.
+            Требуется аутентификация.
+        """,
+        tags=tags,
+        request=BatchCartSerializer,
+    )
+    def post(self, request, *args, **kwargs):
+        user = request.user
+        serializer = BatchCartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        #  Если один и тот же slug передан несколько раз, применяется последнее значение.
+        quantities_by_slug = {item['slug']: item['quantity'] for item in serializer.validated_data['items']}
+        #  Все продукты загружаются одним запросом.
+        products = Product.objects.select_related('seller', 'seller__user').filter(slug__in=quantities_by_slug)
+        products_by_slug = {product.slug: product for product in products}
+        missing = [slug for slug in quantities_by_slug if slug not in products_by_slug]
+        #  Если хотя бы один продукт не найден, корзина не изменяется.
+        if missing:
+            return Response({'message': 'No Product with that slug', 'slugs': missing}, status=404)
+        cart_storage = get_cart_storage()
+        #  Все изменения применяются одной транзакцией пакетными запросами DELETE и INSERT ... ON CONFLICT DO UPDATE.
+        cart_storage.apply_batch(
+            user, {products_by_slug[slug]: quantity for slug, quantity in quantities_by_slug.items()})
+        serializer = self.serializer_class(cart_storage.items(user), many=True)
+        return Response(data={'message': 'Cart Updated', 'items': serializer.data}, status=200)
+
+
 #  Этот код описывает эндпоинт для оформления заказа. Он валидирует данные, получает товары из корзины
 #  создает заказ и связывает его с товарами, а затем возвращает данные о созданном заказе.
 class CheckoutView(APIView):
     permission_classes = [IsOwner]
     serializer_class = CheckoutSerializer
+    throttle_scope = 'cart'
 
     @extend_schema(
         summary='Checkout',
@@ -253,6 +321,9 @@ class CheckoutView(APIView):
     def post(self, request, *args, **kwargs):
         #  Получаем текущего пользователя.
         user = request.user
+        cart_storage = get_cart_storage()
+        #  Записываем корзину из хранилища в базу данных (для хранилища в кеше это отложенная запись).
+        cart_storage.flush(user.pk)
         #  Получаем элементы из корзины текущего пользователя (выборка order=None).
         orderitems = OrderItem.objects.filter(user=user, order=None)
         #  Проверяем на наличие товаров в корзине. Если товаров нет, возвращается ошибка 404.
@@ -291,19 +362,52 @@ class CheckoutView(APIView):
                 data[field] = value
             return data
 
-        #  Создаем заказ с данными пользователя и адреса доставки.
-        order = Order.objects.create(user=user, **append_shipping_details(shipping))
-        #  Обновление элементов корзины, устанавливая для них связь с созданным заказом.
-        orderitems.update(order=order)
+        try:
+            with transaction.atomic():
+                #  Списываем остаток товаров. Если какого-то товара не хватает, транзакция откатывается.
+                #  Для товаров с разделенным остатком списание идет из случайной строки StockShard.
+                reserve_stock(orderitems.values_list('product_id', 'quantity', 'product__stock_shard_count'))
+                order = self.place_order(user, orderitems, append_shipping_details(shipping))
+        except OutOfStock as exc:
+            product = Product.objects.unfiltered().get(pk=exc.product_id)
+            return Response({'message': 'Not enough stock', 'slug': product.slug}, status=409)
+        #  Корзина оформлена в заказ, поэтому ее копия в хранилище больше не нужна.
+        cart_storage.clear(user.pk)
         #  Сериализация созданного заказа с помощью OrderSerializer
         serializer = OrderSerializer(order)
         #  Возврат ответа с сообщением и данными о заказе.
         return Response(data={'message': 'Checkout Successful', 'item': serializer.data}, status=200)
 
+    def place_order(self, user, orderitems, shipping_details):
+        #  Создаем заказ с данными пользователя и адреса доставки.
+        order = Order.objects.create(user=user, **shipping_details)
+        #  Обновление элементов корзины, устанавливая для них связь с созданным заказом. Одним и тем же
+        #  запросом фиксируем цену товара и стоимость позиции, чтобы изменение цены продавцом
+        #  не меняло стоимость уже оформленных заказов.
+        price = Subquery(Product.objects.unfiltered().filter(pk=OuterRef('product_id')).values('price_current')[:1])
+        orderitems.update(
+            order=order,
+            unit_price=price,
+            line_total=ExpressionWrapper(F('quantity') * price, output_field=DecimalField()),
+        )
+        #  Стоимость заказа считается в базе данных по зафиксированным позициям и сохраняется в заказе.
+        order.subtotal = order.orderitems.aggregate(subtotal=Sum('line_total'))['subtotal']
+        order.total = order.subtotal
+        order.save(update_fields=['subtotal', 'total'])
+        #  Медленная работа после оформления заказа (письма, уведомления) ставится в очередь фоновых задач
+        #  одним INSERT в той же транзакции и выполняется обработчиком run_jobs.
+        Job.objects.enqueue_many([
+            (send_order_confirmation, {'order_id': str(order.id)}),
+            (notify_sellers, {'order_id': str(order.id)}),
+            (record_sales, {'order_id': str(order.id)}),
+        ])
+        return order
+
 
 class ReviewView(APIView):
     permission_classes = [IsOwner]
     serializer_class = ReviewSerializer
+    throttle_scope = {'GET': 'catalog', 'POST': 'cart', 'PUT': 'cart', 'DELETE': 'cart'}
 
     @extend_schema(
         summary='Get all product reviews',
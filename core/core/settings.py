@@ -9,6 +9,8 @@ https://docs.djangoproject.com/en/5.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
+import importlib.util
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -16,6 +18,11 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+# Флаг из переменной окружения: 1, true, yes или on
+def env_flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
@@ -47,9 +54,11 @@ INSTALLED_APPS = [
     'apps.sellers',
     'apps.shop',
     'apps.common',
+    'apps.jobs',
 ]
 
 MIDDLEWARE = [
+    'apps.common.query_stats.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +66,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.common.throttling.ThrottleMiddleware',
+    'apps.common.replicas.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -83,13 +94,201 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
+# Настройки базы данных задаются переменными окружения. По умолчанию используется SQLite (DB_ENGINE=sqlite);
+# для нескольких процессов приложения с параллельной записью - PostgreSQL (DB_ENGINE=postgresql).
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+# Параметры соединения SQLite (DB_SQLITE_PROFILE), применяются при создании каждого соединения.
+# tuned: журнал WAL (чтение не блокируется записью), synchronous=NORMAL (в режиме WAL не теряет целостность
+# при сбое процесса), кеш страниц и mmap большего размера, ожидание блокировки вместо ошибки
+# 'database is locked' и BEGIN IMMEDIATE: транзакция сразу получает блокировку записи, поэтому оформление
+# заказа не упирается в невозможность повысить блокировку чтения до записи посреди транзакции.
+# default: параметры SQLite по умолчанию; journal_mode=DELETE возвращает файл базы из режима WAL.
+SQLITE_PROFILES = {
+    'tuned': {
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            f"PRAGMA cache_size=-{int(os.environ.get('DB_SQLITE_CACHE_KB', 64 * 1024))};"
+            f"PRAGMA mmap_size={int(os.environ.get('DB_SQLITE_MMAP_MB', 256)) * 1024 * 1024};"
+            f"PRAGMA busy_timeout={int(os.environ.get('DB_SQLITE_BUSY_TIMEOUT_MS', 5000))};"
+            'PRAGMA temp_store=MEMORY;'
+        ),
+        'transaction_mode': 'IMMEDIATE',
+    },
+    'default': {
+        'init_command': 'PRAGMA journal_mode=DELETE;',
+    },
+}
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'shop'),
+            'USER': os.environ.get('DB_USER', 'shop'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Проверять постоянное соединение перед повторным использованием в новом запросе
+            'CONN_HEALTH_CHECKS': env_flag('DB_CONN_HEALTH_CHECKS', True),
+            'OPTIONS': {},
+        }
+    }
+    if env_flag('DB_POOL', True):
+        # Пул соединений psycopg (https://docs.djangoproject.com/en/5.1/ref/databases/#connection-pool).
+        # Размер пула задается на один процесс приложения: суммарный max_size всех процессов
+        # не должен превышать max_connections сервера PostgreSQL.
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            # Сколько секунд запрос ждет свободного соединения, прежде чем получить ошибку
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            # Через сколько секунд простоя лишние соединения сверх min_size закрываются
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+        }
+    else:
+        # Без пула соединение остается открытым DB_CONN_MAX_AGE секунд (0 - закрывается после запроса)
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+            'CONN_HEALTH_CHECKS': env_flag('DB_CONN_HEALTH_CHECKS', False),
+            'OPTIONS': SQLITE_PROFILES[os.environ.get('DB_SQLITE_PROFILE', 'tuned')],
+        }
+    }
+
+
+# Реплики для чтения (apps.common.replicas.ReplicaRouter): через запятую имена файлов SQLite
+# или хосты PostgreSQL. Остальные параметры соединения берутся у основной базы.
+# Для SQLite реплики заполняются командой sync_replicas.
+REPLICA_DATABASES = []
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST' if DB_ENGINE == 'postgresql' else 'NAME': replica.strip(),
+        # В тестах реплика - это та же тестовая база
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['apps.common.replicas.ReplicaRouter']
+
+# Сколько секунд после запроса на запись клиент читает с основной базы, а не с реплик
+REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Для разработки и тестов используется кеш в памяти процесса. Если запущено несколько процессов,
+# его можно заменить на django.core.cache.backends.filebased.FileBasedCache или на Redis/Memcached.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+# Время жизни записи продукта в кеше продуктов (секунды)
+PRODUCT_CACHE_TIMEOUT = 60 * 5
+
+# Хранилище корзины: apps.shop.cart.DatabaseCartStorage (таблица OrderItem)
+# или apps.shop.cart.CacheCartStorage (кеш с отложенной записью в OrderItem при оформлении заказа).
+# CacheCartStorage требует общего кеша без вытеснения: с кешем в памяти процесса приложение не запустится.
+CART_STORAGE = 'apps.shop.cart.DatabaseCartStorage'
+# Время жизни корзины в кеше (секунды)
+CART_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+# Через сколько секунд простоя корзина из кеша записывается командой flush_idle_carts
+CART_IDLE_FLUSH_SECONDS = 60 * 15
+
+
+# Количество строк StockShard по умолчанию для товаров с разделенным остатком
+STOCK_SHARDS = 8
+# Время жизни кешированной суммы разделенного остатка (секунды)
+STOCK_LEVEL_CACHE_TIMEOUT = 5
+
+# Номер хоста для генератора ссылок на транзакцию (0 - 1023), уникальный среди хостов приложения.
+# Вместе с PID процесса образует идентификатор узла. Если не задан, идентификатор узла вычисляется
+# из имени хоста и PID процесса.
+TX_REF_NODE_ID = None
+
+# Через сколько дней после доставки заказ переносится в архив командой archive_orders
+ORDER_ARCHIVE_AFTER_DAYS = 365
+
+
+# Фоновые задачи (apps.jobs)
+# Количество процессов обработчика run_jobs
+JOBS_WORKER_PROCESSES = 2
+# Пауза между проверками пустой очереди (секунды)
+JOBS_POLL_INTERVAL = 1.0
+# Количество попыток выполнения задачи
+JOBS_MAX_ATTEMPTS = 5
+# Базовая и максимальная задержка перед повтором (секунды), задержка удваивается с каждой попыткой
+JOBS_RETRY_BACKOFF = 10
+JOBS_RETRY_BACKOFF_MAX = 60 * 60
+# Через сколько секунд задача в статусе RUNNING считается брошенной и возвращается в очередь
+JOBS_LOCK_TIMEOUT = 60 * 15
+
+
+# Ограничение частоты запросов (apps.common.throttling.ThrottleMiddleware)
+THROTTLE_ENABLED = True
+# Ограничения по группам представлений (атрибут throttle_scope): запросов за период на одного клиента.
+# Клиент определяется по пользователю из JWT или по IP-адресу.
+THROTTLE_RATES = {
+    'catalog': '600/min',
+    'cart': '120/min',
+    'auth': '10/min',
+    'seller_write': '60/min',
+}
+# Хранилище корзин токенов: MemoryBucketStore (в памяти каждого процесса) или
+# CacheBucketStore (в кеше THROTTLE_CACHE_ALIAS, общем для всех процессов и узлов)
+THROTTLE_STORE = 'apps.common.throttling.MemoryBucketStore'
+THROTTLE_CACHE_ALIAS = 'default'
+# Максимальное количество корзин в MemoryBucketStore
+THROTTLE_MAX_KEYS = 100_000
+
+
+# Учет запросов к базе данных для каждого HTTP-запроса (apps.common.query_stats.QueryStatsMiddleware):
+# при DEBUG - заголовки ответа X-DB-*, иначе - поля записи лога apps.common.query_stats
+QUERY_STATS_ENABLED = True
+# Уровень лога apps.common.query_stats: INFO - строка на каждый HTTP-запрос. Тесты, запущенные через
+# TEST_RUNNER, понижают его до WARNING, если переменная окружения не задана.
+QUERY_STATS_LOG_LEVEL = os.environ.get('QUERY_STATS_LOG_LEVEL', 'INFO')
+
+TEST_RUNNER = 'apps.common.test_runner.QuietQueryStatsTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # Поля db_* доступны форматтеру как атрибуты записи (например, для вывода в JSON)
+        'apps.common.query_stats': {
+            'handlers': ['console'],
+            'level': QUERY_STATS_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
+
+# Email
+# https://docs.djangoproject.com/en/5.1/topics/email/
+
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'shop@example.com'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -110,6 +309,43 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Хеширование паролей
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+
+# Первый хешер используется для новых паролей. Argon2 выбирается, если установлена библиотека argon2-cffi,
+# иначе scrypt. Остальные хешеры нужны для проверки существующих паролей: при входе такие пароли
+# перехешируются первым хешером.
+PASSWORD_HASHERS = [
+    'apps.accounts.hashers.TunedScryptPasswordHasher',
+    'apps.accounts.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+if importlib.util.find_spec('argon2'):
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
+# Параметры стоимости хешеров. При их изменении пароли перехешируются при следующем входе пользователя.
+PASSWORD_SCRYPT = {
+    'work_factor': 2 ** 14,
+    'block_size': 8,
+    'parallelism': 1,
+}
+PASSWORD_ARGON2 = {
+    'time_cost': 2,
+    'memory_cost': 64 * 1024,
+    'parallelism': 1,
+}
+
+# Количество потоков пула хеширования паролей (apps.accounts.hashing) и сколько запросов
+# может ждать свободного потока сверх этого числа
+PASSWORD_HASHING_WORKERS = 2
+PASSWORD_HASHING_QUEUE = 32
+
+AUTHENTICATION_BACKENDS = [
+    'apps.accounts.backends.PooledHashingModelBackend',
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -136,7 +372,7 @@ AUTH_USER_MODEL = "accounts.User"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -152,9 +388,20 @@ SPECTACULAR_SETTINGS = {
     }
 }
 
+# Время жизни записи пользователя в кеше CachedJWTAuthentication (секунды).
+# С кешем в памяти процесса пользователь не кешируется и загружается из базы данных на каждый запрос.
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Сколько секунд кешируется отрицательный результат проверки черного списка токенов.
+# Положительный результат кешируется до истечения срока действия токена. С кешем в памяти процесса
+# отрицательный результат не кешируется, иначе блокировку токена не увидели бы другие процессы.
+TOKEN_BLACKLIST_CACHE_TIMEOUT = 60
+
 SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
+    'TOKEN_REFRESH_SERIALIZER': 'apps.accounts.tokens.CachedTokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'apps.accounts.tokens.CachedTokenVerifySerializer',
 }